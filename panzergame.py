@@ -6,39 +6,96 @@ download: https://github.com/petzivienna/panzergame
 idea: vertical shooter with python3 and pygame
 """
 import pygame
+import abc
+import concurrent.futures
+import functools
+import heapq
+import json
+import mmap
 import random
 import os
-#import time
+import tempfile
+import time
+import zlib
+try:
+    import numpy # optional, for ParticleSystem
+except ImportError:
+    numpy = None
 #import math
 
 """Best game: 10 waves by Ines"""
 
 def randomize_color(color, delta=50):
-    d=random.randint(-delta, delta)
+    d=Viewer.rng.randint(-delta, delta)
     color = color + d
     color = min(255,color)
     color = max(0, color)
     return color
 
+@functools.lru_cache(maxsize=None)
+def get_font(name=None, size=24, bold=False):
+    """pygame font, SysFont looks it up only once per name, size and bold.
+       call get_font.cache_clear() after pygame.quit()"""
+    return pygame.font.SysFont(name, size, bold=bold)
+
+@functools.lru_cache(maxsize=512)
+def render_text(text, color, size, name=None, bold=False):
+    """rendered text, the last 512 different texts are kept.
+       the surface is shared: blit it, never draw on it.
+       call render_text.cache_clear() after pygame.quit()"""
+    return get_font(name, size, bold).render(text, True, color).convert_alpha()
+
 def make_text(msg="pygame is cool", fontcolor=(255, 0, 255), fontsize=42, font=None):
-    """returns pygame surface with text. You still need to blit the surface."""
-    myfont = pygame.font.SysFont(font, fontsize)
-    mytext = myfont.render(msg, True, fontcolor)
-    mytext = mytext.convert_alpha()
-    return mytext
+    """returns pygame surface with text. You still need to blit the surface.
+       the surface is shared with every other make_text of the same text"""
+    return render_text(msg, tuple(fontcolor), fontsize, font)
 
 def write(background, text, x=50, y=150, color=(0,0,0),
           fontsize=None, center=False):
-        """write text on pygame surface. """
+        """write text on pygame surface, returns the rect written to"""
         if fontsize is None:
             fontsize = 24
-        font = pygame.font.SysFont('mono', fontsize, bold=True)
-        fw, fh = font.size(text)
-        surface = font.render(text, True, color)
+        surface = render_text(text, tuple(color), fontsize, 'mono', True)
+        fw, fh = surface.get_size()
         if center: # center text around x,y
-            background.blit(surface, (x-fw//2, y-fh//2))
+            return background.blit(surface, (x-fw//2, y-fh//2))
         else:      # topleft corner is x,y
-            background.blit(surface, (x,y))
+            return background.blit(surface, (x,y))
+
+def painted_image(paint, *params):
+    """shared, display format surface made by paint(*params).
+       paints only once for each paint function and params, all sprites
+       with the same params get the same surface: never draw on it!"""
+    key = (paint,) + params
+    image = Viewer.painted.get(key)
+    if image is None:
+        image = paint(*params).convert()
+        Viewer.painted[key] = image
+        Viewer.painted_surfaces.add(image)
+    return image
+
+class Silence(object):
+    """stands in for a pygame.mixer.Sound when there is no mixer"""
+
+    def play(self, *args, **kwargs):
+        return None
+
+    def stop(self):
+        pass
+
+    def set_volume(self, volume):
+        pass
+
+def quantize_angle(angle, precision=1):
+    """angle rounded to a multiple of precision, in [0, 360)"""
+    return round(angle / precision) * precision % 360
+
+def percentile(values, q):
+    """q-th percentile (0..100) of a list of numbers, nearest rank"""
+    values = sorted(values)
+    if len(values) == 0:
+        return 0
+    return values[min(len(values)-1, int(round(q / 100 * (len(values)-1))))]
 
 def elastic_collision(sprite1, sprite2):
         """elasitc collision between 2 VectorSprites (calculated as disc's).
@@ -58,8 +115,8 @@ def elastic_collision(sprite1, sprite2):
         cbdys = sprite1.move.y - sy
         distancesquare = dirx * dirx + diry * diry
         if distancesquare == 0:
-            dirx = random.randint(0,11) - 5.5
-            diry = random.randint(0,11) - 5.5
+            dirx = Viewer.rng.randint(0,11) - 5.5
+            diry = Viewer.rng.randint(0,11) - 5.5
             distancesquare = dirx * dirx + diry * diry
         dp = (bdxs * dirx + bdys * diry) # scalar product
         dp /= distancesquare # divide by distance * distance.
@@ -223,6 +280,49 @@ class VectorSprite(pygame.sprite.Sprite):
     """base class for sprites. this class inherits from pygames sprite class"""
     number = 0
     numbers = {} # { number, Sprite }
+    pool = None # Pool that recycles killed sprites of this class, see spawn
+    engine = None # MovementEngine, moves sprites of classes with simple = True
+    simple = False # True: update is nothing but VectorSprite.update
+    world = None # ScrollLayer, scrolls sprites of classes with scenery = True
+    scenery = False # True: standing still on the scrolling ground
+    # ---- state every sprite has for itself, no __dict__ entries ----
+    __slots__ = ("pos", "move", "angle", "age", "hitpoints", "hitpointsfull",
+                 "color", "width", "height", "image", "image0", "rect",
+                 "distance_traveled", "tail", "_layer", "_mask", "_maskimage",
+                 "_engine_index")
+    # ---- defaults, a sprite stores only the ones it changes ----
+    static = False
+    friction = 1.0 # no friction
+    radius = 5
+    mass = 15
+    damage = 10
+    bounce_on_edge = False
+    kill_on_edge = False
+    warp_on_edge = False
+    survive_north = False
+    survive_south = False
+    survive_west = False
+    survive_east = False
+    max_age = None
+    max_distance = None
+    picture = None
+    imagename = None # key in Viewer.images, shared picture
+    bossnumber = None
+    kill_with_boss = False
+    sticky_with_boss = False
+    upkey = None
+    downkey = None
+    rightkey = None
+    leftkey = None
+    speed = 0
+    gravity = None
+
+    @classmethod
+    def spawn(cls, **kwargs):
+        """like cls(**kwargs), but recycles a killed sprite from cls.pool"""
+        if cls.pool is None:
+            return cls(**kwargs)
+        return cls.pool.get(**kwargs)
 
     def __init__(self, **kwargs):
         self._default_parameters(**kwargs)
@@ -232,102 +332,115 @@ class VectorSprite(pygame.sprite.Sprite):
         VectorSprite.number += 1
         VectorSprite.numbers[self.number] = self
         #if "color" not in kwargs:
-        #    self.color = (random.randint(0,255), random.randint(0,255), random.randint(0,255))
+        #    self.color = (Viewer.rng.randint(0,255), Viewer.rng.randint(0,255), Viewer.rng.randint(0,255))
         self.create_image()
         self.distance_traveled = 0 # in pixel
         self.rect.center = (-300,-300) # avoid blinking image in topleft corner
         if self.angle != 0:
             self.set_angle(self.angle)
         self.tail = []
+        if self.simple and self.engine is not None:
+            self.engine.add(self)
+        if self.scenery and self.world is not None:
+            self.world.add(self)
+
+    def revive(self, **kwargs):
+        """make a killed sprite new again, like __init__ but the
+           (shared) image0 is kept. only for sprites without own
+           state besides _default_parameters, see Pool"""
+        for key in list(vars(self)):
+            if hasattr(VectorSprite, key): # back to the class default
+                delattr(self, key)
+        self._default_parameters(**kwargs)
+        self._overwrite_parameters()
+        self.add(self.groups)
+        self.number = VectorSprite.number
+        VectorSprite.number += 1
+        VectorSprite.numbers[self.number] = self
+        self.image = self.image0
+        self.rect = self.image.get_rect()
+        self.distance_traveled = 0
+        self.rect.center = (-300,-300)
+        if self.angle != 0:
+            self.set_angle(self.angle)
+        self.tail = []
+        if self.simple and self.engine is not None:
+            self.engine.add(self)
+        if self.scenery and self.world is not None:
+            self.world.add(self)
+        # instance attributes are gone: the shared image must be a class
+        # attribute, else every revived sprite rotates its own image
+        if self.shared_source() is None:
+            raise RuntimeError("{} is pooled but has no shared image".format(
+                               self.__class__.__name__))
 
     def _overwrite_parameters(self):
         """change parameters before create_image is called"""
         pass
 
     def _default_parameters(self, **kwargs):
-        """get unlimited named arguments and turn them into attributes
-           default values for missing keywords"""
-
+        """get unlimited named arguments and turn them into attributes.
+           missing keywords keep the class level default (see top of
+           class), only the per-sprite state below is always set"""
         for key, arg in kwargs.items():
             setattr(self, key, arg)
         if "layer" not in kwargs:
             self._layer = 4
         else:
             self._layer = self.layer
-        if "static" not in kwargs:
-            self.static = False
         if "pos" not in kwargs:
-            self.pos = pygame.math.Vector2(random.randint(0, Viewer.width),-50)
+            self.pos = pygame.math.Vector2(Viewer.rng.randint(0, Viewer.width),-50)
         if "move" not in kwargs:
             self.move = pygame.math.Vector2(0,0)
-        if "friction" not in kwargs:
-            self.friction = 1.0 # no friction
-        if "radius" not in kwargs:
-            self.radius = 5
         if "width" not in kwargs:
             self.width = self.radius * 2
         if "height" not in kwargs:
             self.height = self.radius * 2
-
         if "hitpoints" not in kwargs:
             self.hitpoints = 100
         self.hitpointsfull = self.hitpoints # makes a copy
-        if "mass" not in kwargs:
-            self.mass = 10
-        if "damage" not in kwargs:
-            self.damage = 10
-        if "bounce_on_edge" not in kwargs:
-            self.bounce_on_edge = False
-        if "kill_on_edge" not in kwargs:
-            self.kill_on_edge = False
         if "angle" not in kwargs:
             self.angle = 0 # facing right?
-        if "max_age" not in kwargs:
-            self.max_age = None
-        if "max_distance" not in kwargs:
-            self.max_distance = None
-        if "picture" not in kwargs:
-            self.picture = None
-        if "bossnumber" not in kwargs:
-            self.bossnumber = None
-        if "kill_with_boss" not in kwargs:
-            self.kill_with_boss = False
-        if "sticky_with_boss" not in kwargs:
-            self.sticky_with_boss = False
-        if "mass" not in kwargs:
-            self.mass = 15
-        if "upkey" not in kwargs:
-            self.upkey = None
-        if "downkey" not in kwargs:
-            self.downkey = None
-        if "rightkey" not in kwargs:
-            self.rightkey = None
-        if "leftkey" not in kwargs:
-            self.leftkey = None
-        if "speed" not in kwargs:
-            self.speed = None
         if "age" not in kwargs:
             self.age = 0 # age in seconds
-        if "warp_on_edge" not in kwargs:
-            self.warp_on_edge = False
-        if "gravity" not in kwargs:
-            self.gravity = None
-        if "survive_north" not in kwargs:
-            self.survive_north = False
-        if "survive_south" not in kwargs:
-            self.survive_south = False
-        if "survive_west" not in kwargs:
-            self.survive_west = False
-        if "survive_east" not in kwargs:
-            self.survive_east = False
-        if "speed" not in kwargs:
-            self.speed = 0
+        self._mask = None
+        self._maskimage = None # the image self._mask was made from
+        self._engine_index = None # moved by VectorSprite.engine if not None
         if "color" not in kwargs:
-            self.color = (random.randint(0,255), random.randint(0,255), random.randint(0,255))
+            self.color = (Viewer.rng.randint(0,255), Viewer.rng.randint(0,255), Viewer.rng.randint(0,255))
+
+    @property
+    def mask(self):
+        """collision mask for pygame.sprite.collide_mask.
+           made again only when self.image was replaced (rotate, set_angle,
+           create_image). sprites with the same imagename and angle share
+           one mask from Viewer.masks, so do sprites with the same
+           painted image"""
+        if self._maskimage is not self.image:
+            self._maskimage = self.image
+            source = self.shared_source()
+            if source is None:
+                self._mask = pygame.mask.from_surface(self.image)
+            else:
+                key = (source,
+                       quantize_angle(self.angle, Viewer.angle_precision))
+                self._mask = Viewer.masks.get(key)
+                if self._mask is None:
+                    if len(Viewer.masks) >= Viewer.max_masks:
+                        Viewer.masks.clear()
+                    self._mask = pygame.mask.from_surface(self.image)
+                    Viewer.masks[key] = self._mask
+        return self._mask
 
     def kill(self):
         if self.number in self.numbers:
            del VectorSprite.numbers[self.number] # remove Sprite from numbers dict
+           if self.pool is not None:
+               self.pool.release(self)
+        if self._engine_index is not None:
+            self.engine.remove(self)
+        if self.scenery and self.world is not None:
+            self.world.remove(self)
         pygame.sprite.Sprite.kill(self)
 
     def create_image(self):
@@ -346,8 +459,7 @@ class VectorSprite(pygame.sprite.Sprite):
         """rotates a sprite and changes it's angle by by_degree"""
         self.angle += by_degree
         oldcenter = self.rect.center
-        self.image = pygame.transform.rotate(self.image0, self.angle)
-        self.image.convert_alpha()
+        self.image = self.rotated_image()
         self.rect = self.image.get_rect()
         self.rect.center = oldcenter
 
@@ -355,13 +467,36 @@ class VectorSprite(pygame.sprite.Sprite):
         """rotates a sprite and changes it's angle to degree"""
         self.angle = degree
         oldcenter = self.rect.center
-        self.image = pygame.transform.rotate(self.image0, self.angle)
-        self.image.convert_alpha()
+        self.image = self.rotated_image()
         self.rect = self.image.get_rect()
         self.rect.center = oldcenter
 
+    def rotated_image(self):
+        """image0 rotated by self.angle. Sprites with a shared picture
+           share one rotated surface per angle from Viewer.rotations, with
+           the angle rounded to Viewer.angle_precision degrees"""
+        source = self.shared_source()
+        if source is None:
+            return pygame.transform.rotate(self.image0, self.angle)
+        return Viewer.rotated(source, self.angle)
+
+    def shared_source(self):
+        """imagename or painted surface this sprite's image0 is shared
+           with, None if image0 belongs to this sprite only"""
+        if self.imagename is not None:
+            return self.imagename
+        if self.image0 in Viewer.painted_surfaces:
+            return self.image0
+        return None
+
     def update(self, seconds):
         """calculate movement, position and bouncing on edge"""
+        if self._engine_index is not None:
+            return # VectorSprite.engine does all this
+        if self.scenery and self.world is not None:
+            if self.hitpoints <= 0:
+                self.kill()
+            return # VectorSprite.world scrolls it
         # ----- kill because... ------
         if self.hitpoints <= 0:
             self.kill()
@@ -430,69 +565,84 @@ class Triangle(VectorSprite):
     
     
     def _overwrite_parameters(self):
-        self.pos = pygame.math.Vector2(random.randint(
+        self.pos = pygame.math.Vector2(Viewer.rng.randint(
                    0, Viewer.width) , -1)
         self.kill_on_edge = True
         self.move = pygame.math.Vector2(
-                        random.randint(-20,20),
-                       -random.randint(50,175))
+                        Viewer.rng.randint(-20,20),
+                       -Viewer.rng.randint(50,175))
     
-    def create_image(self):
-        self.image = pygame.Surface((50,50))
-        bild = random.choice ((1,2,3,4)) #
+    @staticmethod
+    def paint(bild):
+        """draw one of the four designs, see painted_image"""
+        image = pygame.Surface((50,50))
         if bild == 1:
             #deltaflügler
-            pygame.draw.line(self.image, (200,0,0), (0,0), (40,0),3)
-            pygame.draw.line(self.image, (200,0,0), (0,0), (20,40),3)
-            pygame.draw.line(self.image, (200,0,0), (20,40), (40,0),3)
+            pygame.draw.line(image, (200,0,0), (0,0), (40,0),3)
+            pygame.draw.line(image, (200,0,0), (0,0), (20,40),3)
+            pygame.draw.line(image, (200,0,0), (20,40), (40,0),3)
             #rufzeichen
-            pygame.draw.line(self.image, (0,0,255), (20,25), (20,0),7)
+            pygame.draw.line(image, (0,0,255), (20,25), (20,0),7)
             #triebwerke
-            pygame.draw.line(self.image, (0,0,255), (0,0), (0,40),1)
-            pygame.draw.line(self.image, (0,0,255), (40,0), (40,40),3)
+            pygame.draw.line(image, (0,0,255), (0,0), (0,40),1)
+            pygame.draw.line(image, (0,0,255), (40,0), (40,40),3)
         if bild == 2:
             #Tie-fighter
-            pygame.draw.line(self.image, (0,0,255), (20,0), (40,20),3)
-            pygame.draw.line(self.image, (0,0,255), (40,20), (20,40),3)
-            pygame.draw.line(self.image, (0,0,255), (20,40), (0,20),3)
-            pygame.draw.line(self.image, (0,0,255), (0,20), (20,0),3)
-            pygame.draw.line(self.image, (0,0,255), (0,0), (0,40),3)
-            pygame.draw.line(self.image, (0,0,255), (40,0), (40,40),3)
-            pygame.draw.circle(self.image, (255,0,0), (20,20),11,2)
-            pygame.draw.line(self.image, (255,0,0), (9,20), (31,20),2)
-            pygame.draw.line(self.image, (255,0,0), (20,9), (20,31),2)
+            pygame.draw.line(image, (0,0,255), (20,0), (40,20),3)
+            pygame.draw.line(image, (0,0,255), (40,20), (20,40),3)
+            pygame.draw.line(image, (0,0,255), (20,40), (0,20),3)
+            pygame.draw.line(image, (0,0,255), (0,20), (20,0),3)
+            pygame.draw.line(image, (0,0,255), (0,0), (0,40),3)
+            pygame.draw.line(image, (0,0,255), (40,0), (40,40),3)
+            pygame.draw.circle(image, (255,0,0), (20,20),11,2)
+            pygame.draw.line(image, (255,0,0), (9,20), (31,20),2)
+            pygame.draw.line(image, (255,0,0), (20,9), (20,31),2)
         if bild == 3:
             # pingufighter
-            pygame.draw.polygon(self.image, (255,0,0),[(20,0), (40,40), (0,40)]   )
-            pygame.draw.circle(self.image, (0,0,255), (20,20), 10)
+            pygame.draw.polygon(image, (255,0,0),[(20,0), (40,40), (0,40)]   )
+            pygame.draw.circle(image, (0,0,255), (20,20), 10)
         if bild == 4:
             # pentagramm
-            pygame.draw.polygon(self.image,(255,0,0),[(15,0),(50,20),(10,50),(40,0),(38,40)])    
+            pygame.draw.polygon(image,(255,0,0),[(15,0),(50,20),(10,50),(40,0),(38,40)])    
             
             
         #gemeinsamer Teil   
-        self.image.set_colorkey((0,0,0))
-        self.image.convert_alpha()
-        self.image0 = self.image.copy()
+        image.set_colorkey((0,0,0))
+        return image
+
+    def create_image(self):
+        self.image = painted_image(Triangle.paint, Viewer.rng.choice ((1,2,3,4)))
+        self.image0 = self.image # shared, never changed
         self.rect = self.image.get_rect()
         
 class Plasma(VectorSprite):
-    
+    blues = tuple(range(135, 256, 15)) # flickering between these
+
     def _overwrite_parameters(self):
          self.kill_on_edge = True
          self.radius = 10
          self.delta = 1
          self.damage = 50
-         
+
+    @staticmethod
+    def paint(radius, b):
+        """one frame of the pulse, see painted_image"""
+        image = pygame.Surface((radius*2,radius*2))
+        pygame.draw.circle(image, (255,255,b), (radius,radius), radius)
+        image.set_colorkey((0,0,0))
+        return image
+
+    @staticmethod
+    def prerender():
+        """paint every frame of the pulse (radius 10 to 20) in every color"""
+        for radius in range(10, 21):
+            for b in Plasma.blues:
+                painted_image(Plasma.paint, radius, b)
+
     def create_image(self):
-        self.image = pygame.Surface((self.radius*2,self.radius*2))
-        r = 255
-        g = 255
-        b = random.randint(128,255)
-        pygame.draw.circle(self.image, (r,g,b), (self.radius,self.radius), self.radius)
-        self.image.set_colorkey((0,0,0))
-        self.image.convert_alpha()
-        self.image0 = self.image.copy()
+        self.image = painted_image(Plasma.paint, self.radius,
+                                   Viewer.rng.choice(Plasma.blues))
+        self.image0 = self.image # shared, never changed
         self.rect = self.image.get_rect()
         
     def update(self, seconds):
@@ -511,49 +661,56 @@ class Plasma(VectorSprite):
 
 
 class PowerUp(VectorSprite):
+    simple = True
 
     def _overwrite_parameters(self):
-        self.pos = pygame.math.Vector2(random.randint(
+        self.pos = pygame.math.Vector2(Viewer.rng.randint(
                    0, Viewer.width) , -1)
         self.kill_on_edge = True
         self.move = pygame.math.Vector2(
-                        random.randint(-20,20),
-                       -random.randint(50,175))
+                        Viewer.rng.randint(-20,20),
+                       -Viewer.rng.randint(50,175))
         self._layer = 4
         self.angle = 270
         self.hitpoints = 4
-        self.color = random.choice(((255,0,0), (0,255,0),
+        self.color = Viewer.rng.choice(((255,0,0), (0,255,0),
                                     (0,0,255)
                                   ))
           #                          (255,0,255), ( 255,255,0), (0,255,255),
           #                          (125,128,128),(255,255,255)))
 
+    @staticmethod
+    def paint(color):
+        """a colored disc, see painted_image"""
+        image = pygame.Surface((40,40))
+        pygame.draw.circle(image, color, (20,20), 20)
+        image.set_colorkey((0,0,0))
+        return image
+
     def create_image(self):
-        self.image = pygame.Surface((40,40))
-        pygame.draw.circle(self.image, self.color, (20,20), 20)
-        self.image.set_colorkey((0,0,0))
-        self.image.convert_alpha()
-        self.image0 = self.image.copy()
+        self.image = painted_image(PowerUp.paint, self.color)
+        self.image0 = self.image # shared, never changed
         self.rect = self.image.get_rect()
 
 
 class Enemy1(VectorSprite):
 
     def _overwrite_parameters(self):
-        #self.pos = pygame.math.Vector2(random.randint(
+        #self.pos = pygame.math.Vector2(Viewer.rng.randint(
         #           0, Viewer.width) , -1)
         self.kill_on_edge = True
         self.survive_north = True
-        self.move = pygame.math.Vector2(0,-random.randint(50,100))
+        self.move = pygame.math.Vector2(0,-Viewer.rng.randint(50,100))
         self._layer = 4
         self.angle = 270
         self.hitpoints = 40
 
 
     def create_image(self):
-        self.image = Viewer.images["enemy1"]
+        self.imagename = "enemy1"
+        self.image = Viewer.images[self.imagename]
         #self.image.convert_alpha()
-        self.image0 = self.image.copy()
+        self.image0 = self.image # shared, never changed
         self.rect = self.image.get_rect()
 
     def update(self,seconds):
@@ -563,16 +720,16 @@ class Enemy1(VectorSprite):
 
     def ai(self):
         #pass
-        if self.pos.y < 0 and random.random() < 0.2:
-            self.move += pygame.math.Vector2(random.choice((-7,-5,-2,-1,1,2,5,7)),random.choice((-3,-2,-1,1,2,3)))
+        if self.pos.y < 0 and Viewer.rng.random() < 0.2:
+            self.move += pygame.math.Vector2(Viewer.rng.choice((-7,-5,-2,-1,1,2,5,7)),Viewer.rng.choice((-3,-2,-1,1,2,3)))
 
     def fire(self):
-        if random.random() < 0.03:
-            Viewer.panzersound1.play()
-            a = random.randint(130,220)
+        if Viewer.rng.random() < 0.03:
+            Viewer.sounds.play("panzersound1")
+            a = Viewer.rng.randint(130,220)
             v = pygame.math.Vector2(0,250)
             v.rotate_ip(a)
-            Evilrocket(pos=pygame.math.Vector2(self.pos.x,
+            Evilrocket.spawn(pos=pygame.math.Vector2(self.pos.x,
                                    self.pos.y), angle=a+90,
                                    move=v+self.move, max_age=10,
                                    kill_on_edge=True, color=self.color)
@@ -587,7 +744,7 @@ class Enemy2(Enemy1):
         self.kill_on_edge = True
         self.survive_north = True
         self.move = pygame.math.Vector2(
-                      0,-random.randint(10,25))
+                      0,-Viewer.rng.randint(10,25))
         self._layer = 4
         self.angle = 270
         self.hitpoints = 120
@@ -595,9 +752,10 @@ class Enemy2(Enemy1):
 
 
     def create_image(self):
-        self.image = Viewer.images["enemy2"]
+        self.imagename = "enemy2"
+        self.image = Viewer.images[self.imagename]
         #self.image.convert_alpha()
-        self.image0 = self.image.copy()
+        self.image0 = self.image # shared, never changed
         self.rect = self.image.get_rect()
 
     def update(self,seconds):
@@ -606,18 +764,18 @@ class Enemy2(Enemy1):
         self.fire()
 
     def firesound(self):
-        Viewer.panzersound2.play()
+        Viewer.sounds.play("panzersound2")
  
     def fire(self):
-        if random.random() < 0.005:
+        if Viewer.rng.random() < 0.005:
             self.firesound()
             
-            a = random.randint(260,280)
+            a = Viewer.rng.randint(260,280)
             #sspeeds = [100,150,200,250]
             for speed in self.speeds:
                 v = pygame.math.Vector2(speed, 0)
                 v.rotate_ip(a)
-                Evilrocket(pos=pygame.math.Vector2(self.pos.x,
+                Evilrocket.spawn(pos=pygame.math.Vector2(self.pos.x,
                                    self.pos.y), angle=a+0,
                                    move=v+self.move, max_age=10,
                                    kill_on_edge=True, color=self.color)
@@ -628,7 +786,7 @@ class Enemy3(Enemy2):
     def _overwrite_parameters(self):
         Enemy2._overwrite_parameters(self)
         self.move = pygame.math.Vector2(
-                      0.5,-random.randint(00,50))
+                      0.5,-Viewer.rng.randint(00,50))
         self.hitpoints = 550
         self.speeds = [100,150,200,250,260,270,280,290]
 
@@ -636,84 +794,88 @@ class Enemy3(Enemy2):
     def fire(self):
         """shoot a salvo towards a player"""
         
-        if random.random() < 0.0095:
-            Viewer.panzersound3.play()
+        if Viewer.rng.random() < 0.0095:
+            Viewer.sounds.play("panzersound3")
             targets = []
             for player in [0,1]:
                 if player in VectorSprite.numbers:
                    targets.append(VectorSprite.numbers[player])
             if len(targets) == 0:
                 return
-            t = random.choice(targets)
+            t = Viewer.rng.choice(targets)
             rightvector = pygame.math.Vector2(10,0)
             diffvector = t.pos - self.pos
             a = rightvector.angle_to(diffvector)
-            #a = random.randint(260,280)
+            #a = Viewer.rng.randint(260,280)
             speeds = [200,220,240,260,280,300,320,340]
             for speed in speeds:
                 v = pygame.math.Vector2(speed, 0)
                 v.rotate_ip(a)
-                Evilrocket(pos=pygame.math.Vector2(self.pos.x,
+                Evilrocket.spawn(pos=pygame.math.Vector2(self.pos.x,
                                    self.pos.y), angle=a+0,
                                    move=v+self.move, max_age=10,
                                    kill_on_edge=True, color=self.color)
 
 
     def create_image(self):
-        self.image = Viewer.images["tank1"]
-        self.image0 = self.image.copy()
+        self.imagename = "tank1"
+        self.image = Viewer.images[self.imagename]
+        self.image0 = self.image # shared, never changed
         self.rect = self.image.get_rect()
         
     def firesound(self):
-        Viewer.panzersound2.play()
+        Viewer.sounds.play("panzersound2")
  
 class Enemy4(Enemy2):
 
     def _overwrite_parameters(self):
         Enemy2._overwrite_parameters(self)
         self.move = pygame.math.Vector2(
-                      1,-random.randint(10,25))
+                      1,-Viewer.rng.randint(10,25))
         self.hitpoints = 110
 
     def create_image(self):
-        self.image = Viewer.images["tank2"]
-        self.image0 = self.image.copy()
+        self.imagename = "tank2"
+        self.image = Viewer.images[self.imagename]
+        self.image0 = self.image # shared, never changed
         self.rect = self.image.get_rect()
         
     def firesound(self):
-        Viewer.panzersound4.play()
+        Viewer.sounds.play("panzersound4")
     
 class Enemy5(Enemy2):
 
     def _overwrite_parameters(self):
         Enemy2._overwrite_parameters(self)
         self.move = pygame.math.Vector2(
-                      -0.5,-random.randint(10,25))
+                      -0.5,-Viewer.rng.randint(10,25))
         self.hitpoints = 105
 
     def create_image(self):
-        self.image = Viewer.images["tank2"]
-        self.image0 = self.image.copy()
+        self.imagename = "tank2"
+        self.image = Viewer.images[self.imagename]
+        self.image0 = self.image # shared, never changed
         self.rect = self.image.get_rect()
         
     def firesound(self):
-        Viewer.panzersound5.play()
+        Viewer.sounds.play("panzersound5")
  
 class Enemy6(Enemy2):
 
     def _overwrite_parameters(self):
         Enemy2._overwrite_parameters(self)
         self.move = pygame.math.Vector2(
-                      -1,-random.randint(10,25))
+                      -1,-Viewer.rng.randint(10,25))
         self.hitpoints = 100
 
     def create_image(self):
-        self.image = Viewer.images["tank3"]
-        self.image0 = self.image.copy()
+        self.imagename = "tank3"
+        self.image = Viewer.images[self.imagename]
+        self.image0 = self.image # shared, never changed
         self.rect = self.image.get_rect()
         
     def firesound(self):
-        Viewer.panzersound6.play()
+        Viewer.sounds.play("panzersound6")
  
 
 class Enemy7(Enemy2):
@@ -721,12 +883,13 @@ class Enemy7(Enemy2):
     def _overwrite_parameters(self):
         Enemy2._overwrite_parameters(self)
         self.move = pygame.math.Vector2(
-                      0,-random.randint(10,25))
+                      0,-Viewer.rng.randint(10,25))
         self.hitpoints = 150
 
     def create_image(self):
-        self.image = Viewer.images["tank4"]
-        self.image0 = self.image.copy()
+        self.imagename = "tank4"
+        self.image = Viewer.images[self.imagename]
+        self.image0 = self.image # shared, never changed
         self.rect = self.image.get_rect()
 
 class Enemy8(Enemy2):
@@ -734,12 +897,13 @@ class Enemy8(Enemy2):
     def _overwrite_parameters(self):
         Enemy2._overwrite_parameters(self)
         self.move = pygame.math.Vector2(
-                      0,-random.randint(10,25))
+                      0,-Viewer.rng.randint(10,25))
         self.hitpoints = 130
 
     def create_image(self):
-        self.image = Viewer.images["tank5"]
-        self.image0 = self.image.copy()
+        self.imagename = "tank5"
+        self.image = Viewer.images[self.imagename]
+        self.image0 = self.image # shared, never changed
         self.rect = self.image.get_rect()
 
 class Enemy9(Enemy2):
@@ -747,12 +911,13 @@ class Enemy9(Enemy2):
     def _overwrite_parameters(self):
         Enemy2._overwrite_parameters(self)
         self.move = pygame.math.Vector2(
-                      2,-random.randint(10,25))
+                      2,-Viewer.rng.randint(10,25))
         self.hitpoints = 100
 
     def create_image(self):
-        self.image = Viewer.images["tank6"]
-        self.image0 = self.image.copy()
+        self.imagename = "tank6"
+        self.image = Viewer.images[self.imagename]
+        self.image0 = self.image # shared, never changed
         self.rect = self.image.get_rect()
 
 class Enemy10(Enemy2):
@@ -760,17 +925,19 @@ class Enemy10(Enemy2):
     def _overwrite_parameters(self):
         Enemy2._overwrite_parameters(self)
         self.move = pygame.math.Vector2(
-                      -2,-random.randint(10,25))
+                      -2,-Viewer.rng.randint(10,25))
         self.hitpoints = 100
 
     def create_image(self):
-        self.image = Viewer.images["tank7"]
-        self.image0 = self.image.copy()
+        self.imagename = "tank7"
+        self.image = Viewer.images[self.imagename]
+        self.image0 = self.image # shared, never changed
         self.rect = self.image.get_rect()
 
 
 
 class Bunker1(VectorSprite):
+    scenery = True
     
     def _overwrite_parameters(self):
         
@@ -781,25 +948,30 @@ class Bunker1(VectorSprite):
         
         
     def create_image(self):
-        self.image = Viewer.images["Bunker1"]
-        self.image0 = self.image.copy()
+        self.imagename = "Bunker1"
+        self.image = Viewer.images[self.imagename]
+        self.image0 = self.image # shared, never changed
         self.rect = self.image.get_rect()
 
     def update(self, seconds):
         VectorSprite.update(self, seconds)
-        if random.random() < 0.001:
-            angle = random.randint(10,60)
-            speed = random.randint(30,70)
-            for a in range(270-angle, 270+angle+1, angle):
-                v = pygame.math.Vector2(speed, 0)
-                v.rotate_ip(a)
-                p = pygame.math.Vector2(self.pos.x, self.pos.y)
-                Plasma(pos = p, move= v)
+        if Viewer.rng.random() < 0.001:
+            self.fire()
+
+    def fire(self):
+        """emit a fan of Plasma balls"""
+        angle = Viewer.rng.randint(10,60)
+        speed = Viewer.rng.randint(30,70)
+        for a in range(270-angle, 270+angle+1, angle):
+            v = pygame.math.Vector2(speed, 0)
+            v.rotate_ip(a)
+            p = pygame.math.Vector2(self.pos.x, self.pos.y)
+            Plasma(pos = p, move= v)
             
 
 class River(VectorSprite):
-    
-    
+    scenery = True
+
     def _overwrite_parameters(self):
         self.kill_on_edge = True
         self.survive_north = True
@@ -808,23 +980,25 @@ class River(VectorSprite):
         
         
     def create_image(self):
-        self.image = Viewer.images["river"]
-        self.image0 = self.image.copy()
+        self.imagename = "river"
+        self.image = Viewer.images[self.imagename]
+        self.image0 = self.image # shared, never changed
         self.rect = self.image.get_rect()
         
         
                  
 class Tree(VectorSprite):
-    
-    
+    scenery = True
+
     def _overwrite_parameters(self):
         
         Enemy2._overwrite_parameters(self)
         self.move = pygame.math.Vector2(0,-5)
     
     def create_image(self):
-        self.image = Viewer.images["tree"]
-        self.image0 = self.image.copy()
+        self.imagename = "tree"
+        self.image = Viewer.images[self.imagename]
+        self.image0 = self.image # shared, never changed
         self.rect = self.image.get_rect()
         self.set_angle(90)
 
@@ -834,7 +1008,7 @@ class Boss1(Enemy1):
         self.kill_on_edge = True
         self.survive_north = True
         self.move = pygame.math.Vector2(
-                   0,-random.randint(1,5))
+                   0,-Viewer.rng.randint(1,5))
         self._layer = 4
         self.angle = 270
         self.hitpoints = 400
@@ -846,52 +1020,59 @@ class Boss1(Enemy1):
 
      def fire(self):
         """shoot a salvo towards a player"""
-        if random.random() < 0.0095:
+        if Viewer.rng.random() < 0.0095:
             targets = []
             for player in [0,1]:
                 if player in VectorSprite.numbers:
                    targets.append(VectorSprite.numbers[player])
             if len(targets) == 0:
                 return
-            t = random.choice(targets)
+            t = Viewer.rng.choice(targets)
             rightvector = pygame.math.Vector2(10,0)
             diffvector = t.pos - self.pos
             a = rightvector.angle_to(diffvector)
-            #a = random.randint(260,280)
+            #a = Viewer.rng.randint(260,280)
             speeds = [100,120,140,160,180,200,220,240]
             for speed in speeds:
                 v = pygame.math.Vector2(speed, 0)
                 v.rotate_ip(a)
-                Evilrocket(pos=pygame.math.Vector2(self.pos.x,
+                Evilrocket.spawn(pos=pygame.math.Vector2(self.pos.x,
                                    self.pos.y), angle=a+0,
                                    move=v+self.move, max_age=10,
                                    kill_on_edge=True, color=self.color)
 
 
      def create_image(self):
-        self.image = Viewer.images["boss1"]
+        self.imagename = "boss1"
+        self.image = Viewer.images[self.imagename]
         #self.image.convert_alpha()
-        self.image0 = self.image.copy()
+        self.image0 = self.image # shared, never changed
         self.rect = self.image.get_rect()
 
 class Star(VectorSprite):
+    simple = True
 
     def _overwrite_parameters(self):
-        self.pos = pygame.math.Vector2(random.randint(
+        self.pos = pygame.math.Vector2(Viewer.rng.randint(
                    0, Viewer.width) , -1)
         self.kill_on_edge = True
-        self.move = pygame.math.Vector2(0,-random.randint(75,250))
+        self.move = pygame.math.Vector2(0,-Viewer.rng.randint(75,250))
         self._layer = 1
 
-    def create_image(self):
-        self.image = pygame.Surface((16,16))
-        color = random.randint(200,255)
-        radius = random.choice((0,0,0,0,0,1,1,1,1,2,2,3,4,5,6,7,8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,8))
-        pygame.draw.circle(self.image, (color, color, color),
+    @staticmethod
+    def paint(color, radius):
+        """a grey dot, see painted_image"""
+        image = pygame.Surface((16,16))
+        pygame.draw.circle(image, (color, color, color),
                            (3,3), radius)
-        self.image.set_colorkey((0,0,0))
-        self.image.convert_alpha()
-        self.image0 = self.image.copy()
+        image.set_colorkey((0,0,0))
+        return image
+
+    def create_image(self):
+        color = Viewer.rng.randint(200,255)
+        radius = Viewer.rng.choice((0,0,0,0,0,1,1,1,1,2,2,3,4,5,6,7,8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,8,8))
+        self.image = painted_image(Star.paint, color, radius)
+        self.image0 = self.image # shared, never changed
         self.rect = self.image.get_rect()
 
 
@@ -908,10 +1089,10 @@ class Spaceship(VectorSprite):
         self.angle= 90
         self.rockets = 50
         self.rockets0 = 2
-        self.bonusrockets = {}
+        self.bonusrockets = Buffs() # { age when it ends: extra rockets }
         self.speed = 10
         self.speed0 = 10
-        self.bonusspeed = {}
+        self.bonusspeed = Buffs() # { age when it ends: extra speed }
         self.bulletproof = False
         
 
@@ -936,7 +1117,7 @@ class Spaceship(VectorSprite):
             v.rotate_ip(self.angle+point)
             v += self.move # adding speed of spaceship to rocket
             a = self.angle + point
-            Rocket(pos=p+t, move=v, angle=a, bossnumber=self.number,
+            Rocket.spawn(pos=p+t, move=v, angle=a, bossnumber=self.number,
                    kill_on_edge = True, color= self.color, max_age=10)
         #--alt
         #v = pygame.math.Vector2(400,0)
@@ -956,23 +1137,15 @@ class Spaceship(VectorSprite):
 
     def update(self, seconds):
         # -- bonusrocketsverwalutng ---
-        self.rockets = -1
-        self.rockets += self.rockets0
-        for time in self.bonusrockets:
-            if time > self.age:
-                self.rockets += self.bonusrockets[time]
+        self.rockets = -1 + self.rockets0 + self.bonusrockets.expire(self.age)
         # ------- bonus speed verwaltung ----
-        self.speed = 0
-        self.speed += self.speed0
-        for time in self.bonusspeed:
-            if time > self.age:
-                self.speed += self.bonusspeed[time]
+        self.speed = self.speed0 + self.bonusspeed.expire(self.age)
 
 
 
         # ------------------------------
         VectorSprite.update(self, seconds)
-        #if random.random() < 0.8:
+        #if Viewer.rng.random() < 0.8:
         #    for x,y  in [(-30,-8), (-30,8)]:
         #         v = pygame.math.Vector2(x,y)
         #         v.rotate_ip(self.angle)
@@ -1063,7 +1236,7 @@ class Spaceship(VectorSprite):
     def create_image(self):
         self.image = Viewer.images[self.imagename]
         self.image.convert_alpha()
-        self.image0 = self.image.copy()
+        self.image0 = self.image # shared, never changed
         self.rect = self.image.get_rect()
 
 
@@ -1075,12 +1248,25 @@ class Smoke(VectorSprite):
       self._layer = 1
 
 
+    max_radius = 36 # covers the whole 50x50 image
+
+    @staticmethod
+    def paint(color, radius):
+        """one frame of the growing smoke cloud, see painted_image"""
+        image = pygame.Surface((50,50))
+        pygame.draw.circle(image, color, (25,25), radius)
+        image.set_colorkey((0,0,0))
+        return image
+
+    @staticmethod
+    def prerender(color):
+        """paint every frame of the growing smoke cloud in color"""
+        for radius in range(Smoke.max_radius + 1):
+            painted_image(Smoke.paint, color, radius)
+
     def create_image(self):
-        self.image = pygame.Surface((50,50))
-        pygame.draw.circle(self.image, self.color, (25,25),
-                           int(self.age*3))
-        self.image.set_colorkey((0,0,0))
-        self.image.convert_alpha()
+        self.image = painted_image(Smoke.paint, self.color,
+                                   min(int(self.age*3), Smoke.max_radius))
         self.rect = self.image.get_rect()
 
     def update(self, seconds):
@@ -1114,25 +1300,132 @@ class Spark(VectorSprite):
 
 
 class Explosion():
-    """emits a lot of sparks, for Explosion or Spaceship engine"""
+    """emits a lot of sparks, for Explosion or Spaceship engine.
+       the sparks go into Explosion.particles (a ParticleSystem),
+       or become Spark sprites if numpy is not installed"""
+    particles = None
+
     def __init__(self, posvector, minangle=0, maxangle=360, maxlifetime=3,
                  minspeed=5, maxspeed=150, red=255, red_delta=0,
                  green=225, green_delta=25, blue=0, blue_delta=0,
                  minsparks=5, maxsparks=20):
-        for s in range(random.randint(minsparks,maxsparks)):
+        sparks = [] # (move x, move y, duration, (r,g,b))
+        for s in range(Viewer.rng.randint(minsparks,maxsparks)):
             v = pygame.math.Vector2(1,0) # vector aiming right (0°)
-            a = random.randint(minangle,maxangle)
+            a = Viewer.rng.randint(minangle,maxangle)
             v.rotate_ip(a)
-            speed = random.randint(minspeed, maxspeed)
-            duration = random.random() * maxlifetime # in seconds
+            speed = Viewer.rng.randint(minspeed, maxspeed)
+            duration = Viewer.rng.random() * maxlifetime # in seconds
             red   = randomize_color(red, red_delta)
             green = randomize_color(green, green_delta)
             blue  = randomize_color(blue, blue_delta)
-            Spark(pos=pygame.math.Vector2(posvector.x, posvector.y),
-                  angle= a, move=v*speed, max_age = duration,
-                  color=(red,green,blue), kill_on_edge = True)
+            if Explosion.particles is None:
+                Spark(pos=pygame.math.Vector2(posvector.x, posvector.y),
+                      angle= a, move=v*speed, max_age = duration,
+                      color=(red,green,blue), kill_on_edge = True)
+            else:
+                # same color variation as Spark.create_image
+                sparks.append((v.x * speed, v.y * speed, duration,
+                               (randomize_color(red, 50),
+                                randomize_color(green, 50),
+                                randomize_color(blue, 50))))
+        if sparks:
+            Explosion.particles.emit(posvector, sparks)
+
+
+class ParticleSystem(object):
+    """all sparks in numpy arrays: moved, aged, killed on the screen edge
+       and drawn in one vectorised step, no matter how many are alive.
+       pos and move use the VectorSprite convention (y is negative
+       on screen)"""
+
+    def __init__(self, capacity=1024):
+        self.count = 0 # living particles are index 0 .. count-1
+        self.pos = numpy.zeros((capacity, 2))
+        self.move = numpy.zeros((capacity, 2))
+        self.age = numpy.zeros(capacity)
+        self.max_age = numpy.zeros(capacity)
+        self.color = numpy.zeros((capacity, 3), dtype=numpy.uint8)
+
+    def __len__(self):
+        return self.count
+
+    def _grow(self, needed):
+        """make the arrays big enough for needed particles"""
+        capacity = len(self.age)
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        for name in ("pos", "move", "age", "max_age", "color"):
+            old = getattr(self, name)
+            new = numpy.zeros((capacity,) + old.shape[1:], dtype=old.dtype)
+            new[:self.count] = old[:self.count]
+            setattr(self, name, new)
+
+    def emit(self, posvector, sparks):
+        """add sparks [(move x, move y, max_age, (r,g,b)), ...] at posvector"""
+        n = len(sparks)
+        self._grow(self.count + n)
+        new = slice(self.count, self.count + n)
+        self.pos[new] = (posvector.x, posvector.y)
+        self.move[new] = [(x, y) for x, y, _, _ in sparks]
+        self.age[new] = 0
+        self.max_age[new] = [d for _, _, d, _ in sparks]
+        self.color[new] = [c for _, _, _, c in sparks]
+        self.count += n
+
+    def update(self, seconds):
+        """move all particles, kill old ones and those outside the screen"""
+        n = self.count
+        if n == 0:
+            return
+        pos = self.pos[:n]
+        alive = self.age[:n] <= self.max_age[:n]
+        pos += self.move[:n] * seconds
+        self.age[:n] += seconds
+        alive &= ((pos[:, 0] >= 0) & (pos[:, 0] <= Viewer.width) &
+                  (pos[:, 1] <= 0) & (pos[:, 1] >= -Viewer.height))
+        if not alive.all():
+            self.count = int(alive.sum())
+            for name in ("pos", "move", "age", "max_age", "color"):
+                array = getattr(self, name)
+                array[:self.count] = array[:n][alive]
+
+    def draw(self, surface):
+        """draw every particle as a short streak, thick at the front.
+           returns the rect around all particles (None if there are none)"""
+        n = self.count
+        if n == 0:
+            return None
+        x = self.pos[:n, 0]
+        y = -self.pos[:n, 1]
+        speed = numpy.hypot(self.move[:n, 0], self.move[:n, 1])
+        speed[speed == 0] = 1
+        dx = self.move[:n, 0] / speed
+        dy = -self.move[:n, 1] / speed
+        width, height = surface.get_size()
+        try:
+            pixels = pygame.surfarray.pixels3d(surface)
+        except ValueError: # surface has no 24/32 bit pixels
+            for i in range(n):
+                surface.fill(self.color[i], (int(x[i]), int(y[i]), 2, 2))
+        else:
+            for k in range(-4, 4):
+                for side in ((-1, 0, 1) if k <= 0 else (0,)):
+                    px = (x - dx * k - dy * side).astype(int)
+                    py = (y - dy * k + dx * side).astype(int)
+                    inside = ((px >= 0) & (px < width) &
+                              (py >= 0) & (py < height))
+                    pixels[px[inside], py[inside]] = self.color[:n][inside]
+            del pixels # unlock surface
+        left, top = int(x.min()) - 5, int(y.min()) - 5
+        return pygame.Rect(left, top, int(x.max()) + 6 - left,
+                           int(y.max()) + 6 - top).clip(surface.get_rect())
 
 class Rocket(VectorSprite):
+    simple = True
+    imagename = "bullet" # class level: survives revive, see Pool
 
     def _overwrite_parameters(self):
         self._layer = 1
@@ -1142,7 +1435,7 @@ class Rocket(VectorSprite):
 
     def update(self, seconds):
         VectorSprite.update(self, seconds)
-        #if random.random() < 0.5:
+        #if Viewer.rng.random() < 0.5:
         #    Explosion(self.pos,
         #              minangle = self.angle+180-15,
         #              maxangle = self.angle+180+15,
@@ -1154,15 +1447,15 @@ class Rocket(VectorSprite):
         #              blue = 0, blue_delta=0,
         #              )
         # ---- Smoke ---
-        #if random.random() < 0.35:
+        #if Viewer.rng.random() < 0.35:
          #   Smoke(pos=pygame.math.Vector2(self.pos.x, self.pos.y),
          #         color=(100,100,100),
          #         max_age=2.5)
 
     def create_image(self):
-        self.image = Viewer.images["bullet"]
+        self.image = Viewer.images[self.imagename]
         self.image.convert_alpha()
-        self.image0 = self.image.copy()
+        self.image0 = self.image # shared, never changed
         self.rect = self.image.get_rect()
 
         #self.image = pygame.Surface((20,10))
@@ -1174,6 +1467,8 @@ class Rocket(VectorSprite):
 
 
 class Evilrocket(VectorSprite):
+    simple = True
+    imagename = "red_bullet" # class level: survives revive, see Pool
 
     def _overwrite_parameters(self):
         self._layer = 1
@@ -1182,7 +1477,7 @@ class Evilrocket(VectorSprite):
 
     def update(self, seconds):
         VectorSprite.update(self, seconds)
-        #if random.random() < 0.5:
+        #if Viewer.rng.random() < 0.5:
         #    Explosion(self.pos,
         #              minangle = self.angle+180-15,
         #              maxangle = self.angle+180+15,
@@ -1194,15 +1489,15 @@ class Evilrocket(VectorSprite):
         #              blue = 0, blue_delta=0,
         #              )
         # ---- Smoke ---
-        #if random.random() < 0.35:
+        #if Viewer.rng.random() < 0.35:
          #   Smoke(pos=pygame.math.Vector2(self.pos.x, self.pos.y),
          #         color=(100,100,100),
          #         max_age=2.5)
 
     def create_image(self):
-        self.image = Viewer.images["red_bullet"]
+        self.image = Viewer.images[self.imagename]
         self.image.convert_alpha()
-        self.image0 = self.image.copy()
+        self.image0 = self.image # shared, never changed
         self.rect = self.image.get_rect()
 
         #self.image = pygame.Surface((20,10))
@@ -1216,33 +1511,982 @@ class Evilrocket(VectorSprite):
 class Engine_glow(VectorSprite):
 
     def create_image(self):
-        self.image = Viewer.images["engine_glow"]
+        self.imagename = "engine_glow"
+        self.image = Viewer.images[self.imagename]
         self.image.convert_alpha()
-        self.image0 = self.image.copy()
+        self.image0 = self.image # shared, never changed
         self.rect = self.image.get_rect()
 
 
 class Muzzle_flash(VectorSprite):
 
     def create_image(self):
-        self.image = Viewer.images["muzzle_flash"]
+        self.imagename = "muzzle_flash"
+        self.image = Viewer.images[self.imagename]
         self.image.convert_alpha()
-        self.image0 = self.image.copy()
+        self.image0 = self.image # shared, never changed
         self.rect = self.image.get_rect()
 
 
 
 
+class MovementEngine(object):
+    """structure of arrays physics for simple movers (VectorSprite.simple):
+       pos, move, friction, age, distance and the edge flags of all of them
+       live in numpy arrays. one vectorised pass per step moves them,
+       bounces or warps them on the screen edge and finds the ones to kill,
+       then pos and rect are written back to the sprites (move only if
+       it changed, age when the sprite leaves the engine).
+       nobody else may change pos or move of a sprite in the engine"""
+
+    def __init__(self, capacity=1024):
+        self.sprites = [] # sprite i has its values in row i of the arrays
+        self.pos = numpy.zeros((capacity, 2))
+        self.move = numpy.zeros((capacity, 2))
+        self.friction = numpy.ones(capacity)
+        self.age = numpy.zeros(capacity)
+        self.max_age = numpy.full(capacity, numpy.inf)
+        self.distance = numpy.zeros(capacity)
+        self.max_distance = numpy.full(capacity, numpy.inf)
+        # kill_on_edge, bounce_on_edge, warp_on_edge, survive_north
+        self.flags = numpy.zeros((capacity, 4), dtype=bool)
+
+    def __len__(self):
+        return len(self.sprites)
+
+    def _grow(self):
+        for name in ("pos", "move", "friction", "age", "max_age", "distance",
+                     "max_distance", "flags"):
+            old = getattr(self, name)
+            new = numpy.concatenate((old, old))
+            setattr(self, name, new)
+
+    def add(self, sprite):
+        """take over the movement of sprite, unless it follows a boss"""
+        if sprite.bossnumber is not None and (sprite.kill_with_boss or
+                                              sprite.sticky_with_boss):
+            return
+        i = len(self.sprites)
+        if i == len(self.age):
+            self._grow()
+        self.sprites.append(sprite)
+        sprite._engine_index = i
+        self.pos[i] = sprite.pos.x, sprite.pos.y
+        self.move[i] = sprite.move.x, sprite.move.y
+        self.friction[i] = sprite.friction
+        self.age[i] = sprite.age
+        self.max_age[i] = numpy.inf if sprite.max_age is None else sprite.max_age
+        self.distance[i] = sprite.distance_traveled
+        self.max_distance[i] = (numpy.inf if sprite.max_distance is None
+                                else sprite.max_distance)
+        self.flags[i] = (sprite.kill_on_edge, sprite.bounce_on_edge,
+                         sprite.warp_on_edge, sprite.survive_north)
+
+    def remove(self, sprite):
+        """called by VectorSprite.kill. the last row moves into the gap"""
+        i = sprite._engine_index
+        sprite.age = float(self.age[i])
+        last = len(self.sprites) - 1
+        if i != last:
+            for array in (self.pos, self.move, self.friction, self.age,
+                          self.max_age, self.distance, self.max_distance,
+                          self.flags):
+                array[i] = array[last]
+            moved = self.sprites[last]
+            self.sprites[i] = moved
+            moved._engine_index = i
+        self.sprites.pop()
+        sprite._engine_index = None
+
+    def update(self, seconds):
+        """VectorSprite.update and wallbounce for all sprites at once"""
+        n = len(self.sprites)
+        if n == 0:
+            return
+        pos, move = self.pos[:n], self.move[:n]
+        x, y = pos[:, 0], pos[:, 1]
+        mx, my = move[:, 0], move[:, 1]
+        # ----- kill because... ------
+        dead = ((self.age[:n] > self.max_age[:n]) |
+                (self.distance[:n] > self.max_distance[:n]))
+        pos += move * seconds
+        move *= self.friction[:n, None]
+        self.distance[:n] += numpy.hypot(mx, my) * seconds
+        self.age[:n] += seconds
+        # ---- bounce / kill on screen edge, same order as wallbounce ----
+        kill, bounce, warp, north = self.flags[:n].T
+        changed = self.friction[:n] != 1 # move must be written back
+        for out, killing, value, speed, warpvalue in (
+                (x < 0, kill, 0, mx, Viewer.width),                 # left
+                (y > 0, kill & ~north, 0, my, -Viewer.height),       # upper
+                (x > Viewer.width, kill, Viewer.width, mx, 0),       # right
+                (y < -Viewer.height, kill, -Viewer.height, my, 0)):  # lower
+            if not out.any():
+                continue
+            dead |= out & killing
+            out &= ~killing
+            bouncing = out & bounce
+            speed[bouncing] *= -1
+            changed |= bouncing
+            warping = out & ~bounce & warp
+            coordinate = x if speed is mx else y
+            coordinate[bouncing] = value
+            coordinate[warping] = warpvalue
+        # ---- write back, the rest of the game reads pos and rect ----
+        center = numpy.empty((n, 2))
+        center[:, 0] = numpy.round(x)
+        center[:, 1] = -numpy.round(y)
+        sprites = self.sprites
+        killed = [sprites[i] for i in numpy.flatnonzero(dead).tolist()]
+        for i in numpy.flatnonzero(changed).tolist():
+            sprites[i].move.update(move[i].tolist())
+        for sprite, p, c in zip(sprites, pos.tolist(), center.tolist()):
+            sprite.pos.update(p)
+            sprite.rect.center = c
+            if sprite.hitpoints <= 0:
+                killed.append(sprite)
+        for sprite in killed:
+            sprite.kill()
+
+
+class Pool(object):
+    """recycles killed sprites of one class, see VectorSprite.spawn.
+       a sprite killed during a step is handed out again only after
+       flush(), at the start of the next step, so nothing that still
+       holds it in this step (update loop, SpatialHash) sees it reborn"""
+
+    def __init__(self, cls, maxfree=2000):
+        self.cls = cls
+        self.maxfree = maxfree # keep no more killed sprites than this
+        self.free = [] # killed sprites, ready to be reused
+        self.dead = [] # killed in this step
+        self.requests = 0
+        self.reused = 0
+        self.alive = 0
+        self.peak = 0
+
+    def get(self, **kwargs):
+        """a recycled (or new) sprite of self.cls with kwargs"""
+        self.requests += 1
+        if self.free:
+            sprite = self.free.pop()
+            sprite.revive(**kwargs)
+            self.reused += 1
+        else:
+            sprite = self.cls(**kwargs)
+        self.alive += 1
+        self.peak = max(self.peak, self.alive)
+        return sprite
+
+    def release(self, sprite):
+        """called by VectorSprite.kill"""
+        self.dead.append(sprite)
+        self.alive -= 1
+
+    def flush(self):
+        """sprites killed in the last step can be reused now"""
+        self.free.extend(self.dead[:max(0, self.maxfree - len(self.free))])
+        self.dead = []
+
+    def stats(self):
+        return {"requests": self.requests,
+                "reused": self.reused,
+                "hitrate": self.reused / max(1, self.requests),
+                "alive": self.alive,
+                "peak": self.peak,
+                "pooled": len(self.free)}
+
+
+class LayerBuckets(pygame.sprite.AbstractGroup):
+    """render group like LayeredUpdates, but add and remove are O(1):
+       one insertion ordered bucket (a dict) per layer instead of one
+       sorted list. iterating gives the sprites layer by layer, in the
+       same order as LayeredUpdates"""
+
+    def __init__(self, *sprites):
+        self.buckets = {} # { layer: {sprite: None} }
+        self.layerof = {} # { sprite: layer it was added to }
+        self.order = []   # the layers, sorted
+        pygame.sprite.AbstractGroup.__init__(self)
+        self.add(*sprites)
+
+    def add_internal(self, sprite, layer=None):
+        if layer is None:
+            try:
+                layer = sprite.layer
+            except AttributeError:
+                layer = sprite._layer = 0
+        pygame.sprite.AbstractGroup.add_internal(self, sprite)
+        self.layerof[sprite] = layer
+        bucket = self.buckets.get(layer)
+        if bucket is None:
+            bucket = self.buckets[layer] = {}
+            self.order = sorted(self.buckets)
+        bucket[sprite] = None
+
+    def remove_internal(self, sprite):
+        pygame.sprite.AbstractGroup.remove_internal(self, sprite)
+        del self.buckets[self.layerof.pop(sprite)][sprite]
+
+    def sprites(self):
+        """all sprites, lowest layer first"""
+        result = []
+        for layer in self.order:
+            result.extend(self.buckets[layer])
+        return result
+
+    def layers(self):
+        """the layers in use, sorted"""
+        return [layer for layer in self.order if self.buckets[layer]]
+
+    def get_sprites_from_layer(self, layer):
+        return list(self.buckets.get(layer, ()))
+
+    def __len__(self):
+        return len(self.spritedict)
+
+class ScrollLayer(object):
+    """the ground scrolling down the screen with the scenery on it
+       (Tree, River, Bunker1). the scenery stands still in world
+       coordinates, only one scroll offset moves: pos and rect of all
+       scenery are shifted when the offset reaches the next whole pixel.
+       scenery in layer ground or lower is not drawn sprite by sprite:
+       it is painted once, when added, into strip, the ground in world
+       coordinates (background tiled downwards), taller than the screen.
+       draw() blits the part of the strip under the screen. when the
+       screen reaches the top of the strip, its content is moved down
+       and only the rows above are painted again, see rebase()"""
+
+    def __init__(self, background, speed=5, ground=-5):
+        self.speed = speed # pixels per second, downwards
+        self.scroll = 0.0  # pixels scrolled since the start
+        self.offset = 0    # whole pixels of scroll, applied to the sprites
+        self.ground = ground
+        self.sprites = {}  # { sprite: ticket }
+        self.grounded = {} # { sprite: None }, painted into the strip
+        self.leaving = []  # heap of (offset to kill at, ticket, sprite)
+        self.tickets = 0
+        self.changed = True # all of the screen changed, see changes()
+        self.rects = []     # screen rects that changed, see changes()
+        self.set_background(background)
+
+    def set_background(self, background):
+        self.background = background
+        width, height = background.get_size()
+        self.margin = height # strip rows above the screen
+        self.strip = pygame.Surface((width, height + self.margin), 0,
+                                    background)
+        self.top = -self.offset - self.margin # world y of strip row 0
+        # background the same in every row: scrolling changes only
+        # the pixels of the grounded scenery, else the whole screen
+        pixels = pygame.image.tostring(background, "RGB")
+        row = len(pixels) // height
+        self.uniform = pixels[row:] == pixels[:-row]
+        self.paint(0, self.strip.get_height())
+        self.changed = True
+
+    def add(self, sprite):
+        """sprite.pos is its position at the current scroll offset"""
+        self.tickets += 1
+        self.sprites[sprite] = self.tickets
+        sprite.rect.center = (round(sprite.pos.x), -round(sprite.pos.y))
+        # kill_on_edge: killed when pos.y < -Viewer.height
+        heapq.heappush(self.leaving, (self.offset + sprite.pos.y +
+                       Viewer.height, self.tickets, sprite))
+        if sprite._layer <= self.ground:
+            self.grounded[sprite] = None
+            # drawn last, so on top: no need to paint the others again
+            self.strip.blit(sprite.image, self.strip_rect(sprite))
+            self.rects.append(sprite.rect.copy())
+
+    def remove(self, sprite):
+        self.sprites.pop(sprite, None)
+        if sprite in self.grounded:
+            del self.grounded[sprite]
+            rect = self.strip_rect(sprite)
+            # rows below the screen are never shown again
+            bottom = min(rect.bottom,
+                         self.view() + self.background.get_height())
+            if rect.top < bottom:
+                self.paint(max(rect.top, 0), bottom)
+                self.rects.append(sprite.rect.copy())
+
+    def update(self, seconds):
+        self.scroll += self.speed * seconds
+        delta = int(self.scroll) - self.offset
+        if delta:
+            self.offset += delta
+            for sprite in self.sprites:
+                sprite.pos.y -= delta
+                sprite.rect.y += delta
+            if self.view() < 0:
+                self.rebase()
+            if not self.uniform:
+                self.changed = True
+            else: # where the grounded scenery was and is now
+                self.rects.extend(sprite.rect.union(sprite.rect.move(
+                                  0, -delta)) for sprite in self.grounded)
+        while self.leaving and self.leaving[0][0] < self.offset:
+            _, ticket, sprite = heapq.heappop(self.leaving)
+            if self.sprites.get(sprite) == ticket:
+                sprite.hitpoints = 0
+                sprite.kill()
+
+    def view(self):
+        """strip row at the top of the screen"""
+        return -self.offset - self.top
+
+    def strip_rect(self, sprite):
+        return sprite.rect.move(0, self.view())
+
+    def rebase(self):
+        """move the strip content down so that the screen is at the
+           bottom of the strip again, paint the rows above it"""
+        shift = self.margin - self.view()
+        self.strip.scroll(0, shift)
+        self.top -= shift
+        self.paint(0, shift)
+
+    def paint(self, top, bottom):
+        """paint strip rows top..bottom: background and grounded scenery"""
+        width, height = self.background.get_size()
+        y = top
+        while y < bottom: # the background repeats every height rows
+            row = (self.top + y) % height
+            rows = min(bottom - y, height - row)
+            self.strip.blit(self.background, (0, y), (0, row, width, rows))
+            y += rows
+        self.strip.set_clip((0, top, width, bottom - top))
+        self.strip.blits([(sprite.image, self.strip_rect(sprite))
+                          for sprite in self.grounded], False)
+        self.strip.set_clip(None)
+
+    def draw(self, surface, rect=None):
+        """blit the ground under the screen (or under rect of it)"""
+        if rect is None:
+            rect = surface.get_rect()
+        return surface.blit(self.strip, rect, rect.move(0, self.view()))
+
+    def changes(self):
+        """(True if all of the screen changed, [screen rects changed])
+           since the last call"""
+        changed, rects = self.changed, self.rects
+        self.changed, self.rects = False, []
+        return changed, rects
+
+    def __len__(self):
+        return len(self.sprites)
+
+class Buffs(object):
+    """bonuses that run out, like a dict { end time: amount }, but the
+       ended ones are removed: their end times wait in a min-heap and
+       the sum of the running ones is kept up to date, so expire()
+       costs only the bonuses that really ended"""
+
+    def __init__(self):
+        self.amounts = {} # { end time: amount }, only running ones
+        self.ends = [] # heap of the end times in amounts
+        self.total = 0
+
+    def __setitem__(self, end, amount):
+        if end not in self.amounts:
+            heapq.heappush(self.ends, end)
+            self.amounts[end] = 0
+        self.total += amount - self.amounts[end]
+        self.amounts[end] = amount
+
+    def __getitem__(self, end):
+        return self.amounts[end]
+
+    def __contains__(self, end):
+        return end in self.amounts
+
+    def __len__(self):
+        return len(self.amounts)
+
+    def add(self, end, amount):
+        """amount more until end"""
+        self[end] = self.amounts.get(end, 0) + amount
+
+    def expire(self, now):
+        """removes the bonuses ended at now, returns the sum of the rest"""
+        while self.ends and self.ends[0] <= now:
+            self.total -= self.amounts.pop(heapq.heappop(self.ends))
+        return self.total
+
+class SpawnScheduler(object):
+    """spawns things at random times, each at its own rate per second.
+       the waiting times are exponential (a poisson process), the next
+       spawn time of every thing waits in a heap, so a step without
+       spawns costs one look at the top of the heap"""
+
+    def __init__(self, rng):
+        self.rng = rng
+        self.rates = {} # { spawn function or class: spawns per second }
+        self.heap = [] # (time, tiebreaker, spawn)
+        self.tiebreaker = 0
+        self.spawned = 0
+
+    def set_rates(self, rates, now):
+        """spawn with these rates from now on. waiting times have no
+           memory, so new times can be drawn for everything"""
+        self.rates = dict(rates)
+        self.heap = []
+        for spawn, rate in self.rates.items():
+            self.schedule(spawn, now)
+
+    def schedule(self, spawn, now):
+        rate = self.rates[spawn]
+        if rate > 0:
+            self.tiebreaker += 1
+            heapq.heappush(self.heap, (now + self.rng.expovariate(rate),
+                                       self.tiebreaker, spawn))
+
+    def due(self, now):
+        """yields every spawn due until now, earliest first"""
+        while self.heap and self.heap[0][0] <= now:
+            when, _, spawn = heapq.heappop(self.heap)
+            self.schedule(spawn, when)
+            self.spawned += 1
+            yield spawn
+
+class SoundManager(object):
+    """plays the sounds of Viewer.soundfiles on its own mixer channels.
+       play(name) only asks for a sound, flush() (once per step) plays:
+       - the same sound asked for again before the flush is merged
+       - a sound asked for within its cooldown is dropped
+       - with all voices busy it steals the voice of the lowest priority
+         sound playing (oldest first), if that is lower than its own.
+         else the sound is dropped
+       a voice is busy until its sound has played in game time (not
+       channel.get_busy), so the counters are the same in every run
+       with the same seed. without mixer nothing is played and there
+       is no voice limit, but everything else is counted"""
+
+    def __init__(self, rules, voices=8, mixer=True):
+        self.rules = rules # { name: (priority, cooldown) }
+        self.mixer = mixer
+        self.channels = []
+        if self.mixer:
+            pygame.mixer.set_num_channels(voices)
+            self.channels = [pygame.mixer.Channel(i) for i in range(voices)]
+        self.playing = {} # { channel: (priority, started, game time it ends) }
+        self.pending = {} # { name: None }, asked for since the last flush
+        self.last = {} # { name: time it was played last }
+        self.requests = 0
+        self.played = 0
+        self.merged = 0
+        self.cooled = 0  # dropped: within the cooldown
+        self.dropped = 0 # dropped: no voice free
+        self.stolen = 0
+
+    def play(self, name):
+        self.requests += 1
+        if name in self.pending:
+            self.merged += 1
+        else:
+            self.pending[name] = None
+
+    def flush(self, now):
+        """play the sounds asked for since the last flush, now: game time"""
+        for name in self.pending:
+            priority, cooldown = self.rules.get(name, (0, 0))
+            if name in self.last and now - self.last[name] < cooldown:
+                self.cooled += 1
+                continue
+            if self.mixer:
+                channel = self.voice(priority, now)
+                if channel is None:
+                    self.dropped += 1
+                    continue
+                sound = getattr(Viewer, name)
+                channel.play(sound) # a stolen voice stops its old sound
+                self.playing[channel] = (priority, now,
+                                         now + sound.get_length())
+            self.last[name] = now
+            self.played += 1
+        self.pending.clear()
+
+    def voice(self, priority, now):
+        """a free channel, or one stolen from a lower priority sound"""
+        victim = None
+        for channel in self.channels:
+            if channel not in self.playing or self.playing[channel][2] <= now:
+                return channel
+            if victim is None or self.playing[channel] < self.playing[victim]:
+                victim = channel
+        if victim is not None and self.playing[victim][0] < priority:
+            self.stolen += 1
+            return victim
+        return None
+
+    def stats(self):
+        return {"requests": self.requests,
+                "played": self.played,
+                "merged": self.merged,
+                "cooled": self.cooled,
+                "dropped": self.dropped,
+                "stolen": self.stolen}
+
+class FileCache(abc.ABC):
+    """base of AssetCache and SoundBank: things made from files in the
+       data folder, kept as raw bytes in one file of the cache folder
+       with a manifest (same name, .json) of what they were made from
+       (file, mtime, ...) and where their bytes are. load() maps the raw
+       file when the manifest still fits and rebuilds both when not.
+       subclasses say how to read a file (read), what to make of it
+       (make) and how a thing goes to bytes and back (pack, unpack).
+       safe for many game processes on one cache folder: files are
+       replaced, never rewritten in place (see save)"""
+
+    what = "cache" # for the error message
+
+    def __init__(self, rawname, folder="cache", datafolder="data"):
+        self.folder = folder
+        self.datafolder = datafolder
+        self.rawfile = os.path.join(folder, rawname)
+        self.manifestfile = os.path.splitext(self.rawfile)[0] + ".json"
+        self.hits = 0 # things read from the cache at the last load()
+        self.built = False # True if the last load() rebuilt the cache
+        self.times = {} # { file: seconds } of the last load()
+
+    def load(self, specs, pool=None):
+        """{ name: thing } for all specs ({ name: spec }). with a pool
+           (concurrent.futures executor) the files are read on its
+           threads, make() always runs on the calling (main) thread"""
+        sources = self.sources(specs)
+        try:
+            with open(self.manifestfile) as f:
+                manifest = json.load(f)
+            if manifest["sources"] == sources:
+                t0 = time.perf_counter()
+                with open(self.rawfile, "rb") as f:
+                    with mmap.mmap(f.fileno(), 0,
+                                   access=mmap.ACCESS_READ) as raw:
+                        if len(raw) != manifest["size"]:
+                            raise ValueError("raw file and manifest differ")
+                        with memoryview(raw) as view:
+                            things = {name: self.unpack(view[start:end],
+                                      extra) for name, (start, end, *extra)
+                                      in manifest["index"].items()}
+                self.times = {self.rawfile: time.perf_counter() - t0}
+                self.hits, self.built = len(things), False
+                return things
+        except (OSError, ValueError, KeyError, TypeError):
+            pass # no cache yet or a broken one: build it
+        self.times = {}
+        files = sorted(set(self.filename(spec) for spec in specs.values()))
+        if pool is None:
+            decoded = map(self.decode, files)
+        else:
+            decoded = pool.map(self.decode, files)
+        decoded = dict(zip(files, decoded)) # waits for all files
+        things = {}
+        for name, spec in specs.items():
+            filename = self.filename(spec)
+            t0 = time.perf_counter()
+            things[name] = self.make(decoded[filename], spec)
+            self.times[filename] += time.perf_counter() - t0
+        self.hits, self.built = 0, True
+        self.save(sources, things)
+        return things
+
+    def sources(self, specs):
+        """what the cached things must have been made from"""
+        sources = {"format": self.format(),
+                   "files": {name: dict(self.describe(spec),
+                                        mtime=os.path.getmtime(os.path.join(
+                                        self.datafolder, self.filename(spec))))
+                             for name, spec in specs.items()}}
+        return json.loads(json.dumps(sources)) # tuples as lists, like json
+
+    def decode(self, filename):
+        """read(), timed. runs on the pool threads"""
+        t0 = time.perf_counter()
+        thing = self.read(os.path.join(self.datafolder, filename))
+        self.times[filename] = time.perf_counter() - t0
+        return thing
+
+    def save(self, sources, things):
+        index = {} # { name: [start, end, *extra] in the raw file }
+        chunks = []
+        offset = 0
+        for name, thing in things.items():
+            chunk, extra = self.pack(thing)
+            index[name] = [offset, offset + len(chunk)] + list(extra)
+            offset += len(chunk)
+            chunks.append(chunk)
+        manifest = {"sources": sources, "size": offset, "index": index}
+        try:
+            os.makedirs(self.folder, exist_ok=True)
+            # raw file first, manifest last: a manifest never points at
+            # bytes that are not there yet
+            self.replace(self.rawfile, b"".join(chunks))
+            self.replace(self.manifestfile,
+                         json.dumps(manifest, indent=1).encode())
+        except OSError:
+            print("could not write the", self.what, "to", self.folder)
+
+    def replace(self, path, data):
+        """write data to a temp file next to path, then os.replace it.
+           other processes see the old file or the new one, never a half
+           written one, and a file they have mapped stays as it was"""
+        fd, temp = tempfile.mkstemp(dir=self.folder, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.chmod(temp, 0o644) # mkstemp makes it 0600
+            os.replace(temp, path)
+        except OSError:
+            if os.path.exists(temp):
+                os.remove(temp)
+            raise
+
+    # --- for the subclasses ---
+    def filename(self, spec):
+        return spec
+
+    def describe(self, spec):
+        """json-able dict of what spec makes, for the manifest"""
+        return {"file": self.filename(spec)}
+
+    def format(self):
+        """anything else the raw bytes depend on, json-able"""
+        return None
+
+    @abc.abstractmethod
+    def read(self, path):
+        """the file at path, decoded. runs on the pool threads"""
+
+    def make(self, decoded, spec):
+        return decoded
+
+    @abc.abstractmethod
+    def pack(self, thing):
+        """(bytes, extra): extra is a list of ints that unpack needs"""
+
+    @abc.abstractmethod
+    def unpack(self, view, extra):
+        """the thing from its bytes (a memoryview into the mapped file,
+           only valid during the call: copy it)"""
+
+class AssetCache(FileCache):
+    """the images of Viewer.assets, cut and scaled, as raw RGBA pixels
+       in one file (images.raw) with a manifest (images.json) of sizes
+       and source mtimes. made at the first start, later starts skip
+       decoding and scaling. rebuilt when a source file or an entry in
+       Viewer.assets changes. needs a display (for convert_alpha)"""
+
+    what = "image cache"
+
+    def __init__(self, folder="cache", datafolder="data"):
+        FileCache.__init__(self, "images.raw", folder, datafolder)
+
+    def filename(self, spec):
+        return spec[0]
+
+    def describe(self, spec):
+        filename, part, size = spec
+        return {"file": filename, "part": part, "size": size}
+
+    def read(self, path):
+        """the png file as a surface, not yet in display format.
+           thread safe, pygame lets go of the GIL while decoding"""
+        return pygame.image.load(path)
+
+    def make(self, image, spec):
+        """the decoded image in display format, cut and scaled"""
+        _, part, size = spec
+        image = image.convert_alpha()
+        if part is not None:
+            image = image.subsurface(part).copy()
+        if size is not None:
+            image = pygame.transform.scale(image, size)
+        return image
+
+    def pack(self, image):
+        return pygame.image.tostring(image, "RGBA"), image.get_size()
+
+    def unpack(self, view, size):
+        # convert_alpha copies, frombuffer alone would keep the view
+        return pygame.image.frombuffer(view, size, "RGBA").convert_alpha()
+
+class SoundBank(FileCache):
+    """the sounds of Viewer.soundfiles as raw samples in the exact format
+       of the running mixer, in one file (sounds.pcm) with an index
+       (sounds.json) of byte ranges, source mtimes and mixer format.
+       the file is memory mapped and sliced into
+       pygame.mixer.Sound(buffer=...): no wav parsing, no resampling.
+       rebuilt when a wav or the mixer format changes. needs the mixer"""
+
+    what = "sound bank"
+
+    def __init__(self, folder="cache", datafolder="data"):
+        FileCache.__init__(self, "sounds.pcm", folder, datafolder)
+
+    def format(self):
+        return pygame.mixer.get_init()
+
+    def read(self, path):
+        """the wav file as pygame.mixer.Sound, converted to the mixer
+           format. thread safe, pygame lets go of the GIL while loading"""
+        return pygame.mixer.Sound(path)
+
+    def pack(self, sound):
+        return sound.get_raw(), ()
+
+    def unpack(self, view, extra):
+        return pygame.mixer.Sound(buffer=view) # copies the samples
+
+class SpatialHash(object):
+    """uniform grid broadphase for collision detection.
+       sprites are sorted by their rect into square cells, a query only
+       tests the sprites in the cells touched by the query rect.
+       rebuild it whenever the sprites have moved."""
+
+    def __init__(self, cellsize=100):
+        self.cellsize = cellsize
+        self.cells = {} # { (column, row): [sprite, ...] }
+        self.order = {} # { sprite: insertion index }, keeps group order
+
+    def clear(self):
+        self.cells = {}
+        self.order = {}
+
+    def insert(self, sprite):
+        self.order[sprite] = len(self.order)
+        left, top, right, bottom = self._span(sprite.rect)
+        for column in range(left, right + 1):
+            for row in range(top, bottom + 1):
+                cell = self.cells.get((column, row))
+                if cell is None:
+                    self.cells[(column, row)] = [sprite]
+                else:
+                    cell.append(sprite)
+
+    def rebuild(self, group):
+        """forget everything and insert all sprites of group"""
+        self.clear()
+        for sprite in group:
+            self.insert(sprite)
+
+    def _span(self, rect):
+        """first and last column and row covered by rect"""
+        size = self.cellsize
+        return (rect.left // size, rect.top // size,
+                (rect.right - 1) // size, (rect.bottom - 1) // size)
+
+    def query(self, rect):
+        """living sprites whose rect overlaps rect, in insertion order"""
+        found = set()
+        left, top, right, bottom = self._span(rect)
+        for column in range(left, right + 1):
+            for row in range(top, bottom + 1):
+                for sprite in self.cells.get((column, row), ()):
+                    if sprite not in found and rect.colliderect(sprite.rect):
+                        found.add(sprite)
+        return sorted((s for s in found if s.alive()), key=self.order.get)
+
+    def spritecollide(self, sprite, dokill=False, collided=None):
+        """works like pygame.sprite.spritecollide, but only tests
+           the sprites near sprite"""
+        crashgroup = self.query(sprite.rect)
+        if collided is not None:
+            crashgroup = [s for s in crashgroup if collided(sprite, s)]
+        if dokill:
+            for s in crashgroup:
+                s.kill()
+        return crashgroup
+
+
+class Profiler(object):
+    """rolling per-phase frame timings, drawn as overlay (toggle with F3)"""
+    # phases in the order they happen in a frame
+    phases = ("events", "spawn", "input", "broadphase", "powerup x player", "tree x rocket",
+              "tree x player", "evilrocket x player", "enemy x rocket",
+              "river x enemy", "bunker x player", "bunker x rocket",
+              "collision", "update", "sound", "clear", "draw", "tail", "profiler",
+              "flip", "frame")
+
+    def __init__(self, budget, history=120, bucket=0.002):
+        self.budget = budget # seconds per frame
+        self.history = history # number of frames to remember
+        self.bucket = bucket # width of a histogram bar in seconds
+        self.visible = False
+        self.times = {} # { phase: [seconds, ...] }, the last history frames
+
+    def record(self, phasetimes):
+        """remember the phase durations of one frame"""
+        for phase, seconds in phasetimes.items():
+            values = self.times.setdefault(phase, [])
+            values.append(seconds)
+            if len(values) > self.history:
+                del values[0]
+
+    def histogram(self):
+        """list of frame counts per bucket of frame time,
+           the last bucket collects everything above twice the budget"""
+        buckets = [0] * (int(2 * self.budget / self.bucket) + 1)
+        for seconds in self.times.get("frame", []):
+            buckets[min(len(buckets)-1, int(seconds / self.bucket))] += 1
+        return buckets
+
+    def draw(self, screen, groups):
+        """draw timings, sprite counts and frame time histogram"""
+        x, y = 10, 10
+        write(screen, "{:>20} {:>7} {:>7}".format("phase (ms)", "mean", "max"),
+              x, y, fontsize=14)
+        for phase in self.phases:
+            values = self.times.get(phase)
+            if not values:
+                continue
+            y += 16
+            mean = sum(values) / len(values)
+            color = (255,0,0) if max(values) > self.budget else (0,0,0)
+            write(screen, "{:>20} {:7.2f} {:7.2f}".format(
+                  phase, mean * 1000, max(values) * 1000), x, y,
+                  color=color, fontsize=14)
+        y += 24
+        for name, group in groups.items():
+            write(screen, "{:>20} {:7}".format(name, len(group)), x, y,
+                  fontsize=14)
+            y += 16
+        # ---- frame time histogram, red bars are over budget ----
+        frametimes = self.times.get("frame", [])
+        over = len([s for s in frametimes if s > self.budget])
+        y += 8
+        write(screen, "frames over {:.1f} ms budget: {}/{}".format(
+              self.budget * 1000, over, len(frametimes)), x, y, fontsize=14)
+        y += 20
+        buckets = self.histogram()
+        height = 60
+        for i, count in enumerate(buckets):
+            if count == 0:
+                continue
+            h = max(1, count * height // max(buckets))
+            color = (255,0,0) if i * self.bucket >= self.budget else (0,0,255)
+            pygame.draw.rect(screen, color, (x + i * 8, y + height - h, 7, h))
+        pygame.draw.line(screen, (0,0,0), (x, y + height),
+                         (x + len(buckets) * 8, y + height))
+
+
 class Viewer(object):
     width = 0
     height = 0
     images = {}
-
-    def __init__(self, width=640, height=400, fps=30):
+    masks = {} # { (imagename, angle): pygame.mask.Mask }
+    max_masks = 4096
+    rotations = {} # { (imagename or painted surface, angle): rotated surface }
+    painted = {} # { (paint function, params): surface }, see painted_image
+    painted_surfaces = set() # all surfaces in painted
+    angle_precision = 1 # degrees, for Viewer.rotations and Viewer.masks
+    rng = random.Random() # the only source of randomness for the game
+    # ---- images: name: (file in data, part of it or None, size or None) ----
+    assets = {"player1": ("jeeprequestef9.png", None, (50, 50)),
+              "player2": ("jeeprequestef9.png", None, (50, 50)),
+              "red_bullet": ("red_bullet.png", None, None),
+              "bullet": ("bullet.png", None, None),
+              "enemy1": ("enemy1.png", None, (50, 50)),
+              "enemy2": ("tank1.png", None, (50, 50)),
+              "muzzle_flash": ("muzzle_flash.png", None, (50, 30)),
+              "engine_glow": ("engine_glow.png", None, None),
+              "boss1": ("planet.png", None, (150, 150)),
+              "tank1": ("M-6_preview.png", None, (100, 50)),
+              "tank2": ("E-100_preview.png", None, (100, 50)),
+              "tank3": ("KV-2_preview.png", None, (100, 50)),
+              "tank4": ("Pz.Kpfw.IV-G_preview.png", None, (100, 50)),
+              "tank5": ("T34_preview.png", None, (100, 50)),
+              "tank6": ("Tiger-II_preview.png", None, (100, 50)),
+              "tank7": ("VK.3601h_preview.png", None, (100, 50)),
+              "tree": ("LPCsnowTrees.png", None, None),
+              "river": ("terrain.png", (576, 159, 671-576, 193-159), None),
+              "Bunker1": ("bunker1.png", None, None),
+             }
+    # ---- sounds: Viewer.<name> = pygame.mixer.Sound(file in data) ----
+    soundfiles = {"panzersound1": "panzersound1.wav",
+                  "panzersound2": "panzersound2.wav",
+                  "panzersound3": "panzersound3.wav",
+                  "panzersound4": "panzersound4.wav",
+                  "panzersound5": "panzersound5.wav",
+                  "panzersound6": "panzersound6.wav",
+                  "panzersound7": "panzersound7.wav",
+                  "powersound1": "power1.wav",
+                  "powersound2": "power2.wav",
+                  "powersound3": "power3.wav",
+                  "impact1": "impact1.wav",
+                  "impact2": "impact2.wav",
+                  "impact3": "impact3.wav",
+                 }
+    # ---- sound name: (priority, cooldown in seconds), see SoundManager ----
+    soundrules = {"panzersound1": (1, 0.1),
+                  "panzersound2": (1, 0.1),
+                  "panzersound3": (1, 0.1),
+                  "panzersound4": (1, 0.1),
+                  "panzersound5": (1, 0.1),
+                  "panzersound6": (1, 0.1),
+                  "panzersound7": (1, 0.1),
+                  "powersound1": (3, 0),
+                  "powersound2": (3, 0),
+                  "powersound3": (3, 0),
+                  "impact1": (2, 0.05),
+                  "impact2": (2, 0.05),
+                  "impact3": (2, 0.05),
+                 }
+    sounds = None # SoundManager, made by load_assets
+    # ---- waves: (seconds or None for endless, { class: spawns per second }) ----
+    # one endless wave with the old per-frame chances * 30 fps
+    waves = [(None, {Enemy2: 0.015, Enemy3: 0.06, Enemy4: 0.006, Enemy5: 0.006,
+                     Enemy6: 0.006, Enemy7: 0.006, Enemy8: 0.006, Enemy9: 0.006,
+                     Enemy10: 0.006, PowerUp: 1.2, Tree: 0.15, River: 0.15,
+                     Bunker1: 0.15}),
+            ]
+
+    def __init__(self, width=640, height=400, fps=30, headless=False,
+                 seed=None, timestep=None, angle_precision=1, prewarm=True,
+                 engine=True, dirty=False, loadthreads=4, sound=None,
+                 joysticks=None):
         """Initialize pygame, window, background, font,...
-           default arguments """
-        pygame.mixer.pre_init(44100,-16, 2, 2048)
-        pygame.init()
+           default arguments
+           headless=True uses SDL's dummy video/audio drivers: no window,
+           no flip and no fps cap, for soak tests and balance runs
+           seed: same seed + same inputs = same game, frame by frame
+           timestep: seconds of game time per simulation step (default 1/fps)
+           angle_precision: rotated images are shared per this many degrees
+           prewarm: rotate the bullet images for all angles at load time
+           engine: move simple sprites with the MovementEngine (needs numpy)
+           dirty: clear and show only the screen regions that changed,
+           with a full flip when too much of the screen changed
+           loadthreads: threads reading and decoding the asset files
+           sound / joysticks: start the mixer / read joysticks,
+           default: not when headless. see startup_report for timings"""
+        self.started = time.perf_counter() # for the time to first frame
+        self.firstframe = None # seconds from __init__ to the first frame
+        if seed is None:
+            seed = random.randrange(2**32)
+        self.seed = seed
+        Viewer.rng = random.Random(self.seed)
+        self.headless = headless
+        Viewer.angle_precision = angle_precision
+        self.prewarm = prewarm
+        self.loadthreads = loadthreads
+        self.use_engine = engine and numpy is not None
+        self.sound = not headless if sound is None else sound
+        self.use_joysticks = not headless if joysticks is None else joysticks
+        self.phasetimes = {} # startup phases until the end of __init__
+        t0 = time.perf_counter()
+        if self.headless:
+            # must be set before pygame.display.init()
+            os.environ["SDL_VIDEODRIVER"] = "dummy"
+            os.environ["SDL_AUDIODRIVER"] = "dummy"
+        # only the subsystems this game needs, not pygame.init()
+        pygame.display.init()
+        pygame.font.init()
+        get_font.cache_clear() # fonts die with pygame.quit()
+        render_text.cache_clear()
+        t0 = self.lap("display+font", t0)
+        if self.sound:
+            pygame.mixer.init(44100,-16, 2, 2048)
+            t0 = self.lap("mixer", t0)
         Viewer.width = width    # make global readable
         Viewer.height = height
         self.screen = pygame.display.set_mode((self.width, self.height), pygame.DOUBLEBUF)
@@ -1250,167 +2494,169 @@ class Viewer(object):
         #self.background.fill((0,118,48)) # fill background white
         self.clock = pygame.time.Clock()
         self.fps = fps
+        if timestep is None:
+            timestep = 1 / self.fps
+        self.timestep = timestep
+        self.max_steps = 5 # per rendered frame, so a slow frame can not snowball
+        self.accumulator = 0.0
         self.playtime = 0.0
-        # ------ background images ------
-        self.backgroundfilenames = [] # every .jpg file in folder 'data'
-        try:
-            for root, dirs, files in os.walk("data"):
-                for file in files:
-                    if file[-4:] == ".jpg" or file[-5:] == ".jpeg":
-                        self.backgroundfilenames.append(file)
-            random.shuffle(self.backgroundfilenames) # remix sort order
-        except:
-            print("no folder 'data' or no jpg files in it")
+        self.frames = 0 # simulation steps
+        self.profiler = Profiler(budget=1 / self.fps)
+        # ---- dirty rect rendering ----
+        self.dirty = dirty
+        self.max_dirty = 400 # rects, more than that: full flip
+        self.max_dirty_area = 0.4 # part of the screen, more: full flip
+        self.full_redraw = True # next frame draws and flips everything
+        self.overlay_rects = [] # drawn outside allgroup last frame
+        self.sprite_rects = [] # sprite rects drawn last frame (dirty only)
+        self.dirty_frames = 0 # frames shown with display.update(rects)
+        self.full_frames = 0  # frames shown with a full flip
+        # ---- broadphase, one spatial hash per group that gets hit ----
+        self.spatial = {name: SpatialHash() for name in
+                        ("powerup", "rocket", "tree", "evilrocket",
+                         "enemy", "bunker")}
+        # ------ background images, see background_files ------
+        self.backgroundfilenames = None
+        t0 = self.lap("window", t0)
 
         Viewer.bombchance = 0.015
         Viewer.rocketchance = 0.001
-        Viewer.wave = 0
         self.age = 0
-        # ------ joysticks ----
-        pygame.joystick.init()
-        self.joysticks = [pygame.joystick.Joystick(x) for x in range(pygame.joystick.get_count())]
-        for j in self.joysticks:
-            j.init()
-        self.prepare_sprites()
+        self.joysticks = None # found at the first step, see get_joysticks
+        self.prepare_sprites() # laps prerender, assets, prewarm, sprites
+        t0 = time.perf_counter()
         self.loadbackground()
+        t0 = self.lap("background", t0)
+        self.spawner = SpawnScheduler(Viewer.rng)
+        self.start_wave(0)
+        self.lap("waves", t0)
+        # { phase: seconds } of the startup, phasetimes is for frames now
+        self.startuptimes, self.phasetimes = self.phasetimes, {}
+
+    def start_wave(self, number):
+        """spawn with the rates of Viewer.waves[number] from now on"""
+        Viewer.wave = number
+        seconds, rates = Viewer.waves[number]
+        self.spawner.set_rates(rates, self.playtime)
+        self.waveend = None if seconds is None else self.playtime + seconds
+
+    def get_joysticks(self):
+        """the joysticks. the joystick subsystem is started and the
+           joysticks are enumerated at the first call, not at startup"""
+        if self.joysticks is None:
+            self.joysticks = []
+            if self.use_joysticks:
+                pygame.joystick.init()
+                self.joysticks = [pygame.joystick.Joystick(x) for x in range(pygame.joystick.get_count())]
+                for j in self.joysticks:
+                    j.init()
+        return self.joysticks
+
+    def background_files(self):
+        """every .jpg file in folder 'data', in random order.
+           searched at the first call, not at every start"""
+        if self.backgroundfilenames is None:
+            self.backgroundfilenames = []
+            try:
+                for root, dirs, files in os.walk("data"):
+                    for file in files:
+                        if file[-4:] == ".jpg" or file[-5:] == ".jpeg":
+                            self.backgroundfilenames.append(file)
+                Viewer.rng.shuffle(self.backgroundfilenames) # remix sort order
+            except:
+                print("no folder 'data' or no jpg files in it")
+        return self.backgroundfilenames
+
+    @staticmethod
+    def rotated(source, angle):
+        """Viewer.images[source] (or the painted surface source) rotated
+           by angle, made only once per angle_precision degrees"""
+        angle = quantize_angle(angle, Viewer.angle_precision)
+        key = (source, angle)
+        image = Viewer.rotations.get(key)
+        if image is None:
+            if isinstance(source, str):
+                source = Viewer.images[source]
+            image = pygame.transform.rotate(source, angle)
+            Viewer.rotations[key] = image
+        return image
 
     def loadbackground(self):
 
         #try:
         #    self.background = pygame.image.load(os.path.join("data",
-        #         random.choice(self.backgroundfilenames)))
+        #         Viewer.rng.choice(self.background_files())))
         #except:
         self.background = pygame.Surface(self.screen.get_size()).convert()
         self.background.fill((24,228,28)) # fill background white
 
-        self.background = pygame.transform.scale(self.background,
-                          (Viewer.width,Viewer.height))
-        self.background.convert()
-
+        if self.background.get_size() != (Viewer.width, Viewer.height):
+            self.background = pygame.transform.scale(self.background,
+                              (Viewer.width,Viewer.height)).convert()
+        self.world.set_background(self.background)
+        self.full_redraw = True
+
+
+    def load_assets(self):
+        """images (AssetCache) and sounds (SoundBank). files that must be
+           decoded are read and decoded on a thread pool. returns when
+           everything is loaded. self.loadtimes has the seconds per file
+           (decoding + converting), see startup_report"""
+        t0 = time.perf_counter()
+        cache = AssetCache()
+        bank = SoundBank()
+        with concurrent.futures.ThreadPoolExecutor(
+                 max_workers=self.loadthreads) as pool:
+            Viewer.images.update(cache.load(Viewer.assets, pool))
+            self.loadtimes = dict(cache.times)
+            if self.sound:
+                for name, sound in bank.load(Viewer.soundfiles, pool).items():
+                    setattr(Viewer, name, sound)
+                self.loadtimes.update(bank.times)
+        if not self.sound:
+            for name in Viewer.soundfiles:
+                setattr(Viewer, name, Silence())
+        Viewer.sounds = SoundManager(Viewer.soundrules, mixer=self.sound)
+        self.loadtime = time.perf_counter() - t0
+
+    def startup_report(self):
+        """text with the time of every startup phase and (below that)
+           the load time of every asset file, slowest first"""
+        lines = ["{:>30} {:8.2f} ms".format(phase, seconds * 1000)
+                 for phase, seconds in self.startuptimes.items()]
+        lines.append("{:>30} {:8.2f} ms".format("total",
+                     sum(self.startuptimes.values()) * 1000))
+        lines.append("assets loaded in {:.1f} ms with {} threads".format(
+                 self.loadtime * 1000, self.loadthreads))
+        for filename, seconds in sorted(self.loadtimes.items(),
+                                        key=lambda item: -item[1]):
+            lines.append("{:>30} {:8.2f} ms".format(filename, seconds * 1000))
+        return "\n".join(lines)
 
     def load_sprites(self):
         #try:
-            # load sounds 
-            
-            Viewer.panzersound1 = pygame.mixer.Sound(
-                 os.path.join("data", "panzersound1.wav"))
-            Viewer.panzersound2 = pygame.mixer.Sound(
-                 os.path.join("data","panzersound2.wav"))
-            Viewer.panzersound3 = pygame.mixer.Sound(
-                 os.path.join("data","panzersound3.wav"))
-            Viewer.panzersound4 = pygame.mixer.Sound(
-                 os.path.join("data", "panzersound4.wav"))
-            Viewer.panzersound5 = pygame.mixer.Sound(
-                 os.path.join("data","panzersound5.wav"))
-            Viewer.panzersound6 = pygame.mixer.Sound(
-                 os.path.join("data","panzersound6.wav"))
-            Viewer.panzersound7 = pygame.mixer.Sound(
-                 os.path.join("data","panzersound7.wav"))
-            
-            # -----
-            Viewer.powersound1 = pygame.mixer.Sound(
-                 os.path.join("data","power1.wav"))
-            Viewer.powersound2 = pygame.mixer.Sound(
-                 os.path.join("data","power2.wav"))
-            Viewer.powersound3 = pygame.mixer.Sound(
-                 os.path.join("data","power3.wav"))
-            
-            #-------
-            Viewer.impact1 = pygame.mixer.Sound(
-                 os.path.join("data","impact1.wav"))
-            Viewer.impact2 = pygame.mixer.Sound(
-                 os.path.join("data","impact2.wav"))
-            Viewer.impact3 = pygame.mixer.Sound(
-                 os.path.join("data","impact3.wav"))
-            
-            Viewer.images["player1"]= pygame.image.load(
-                 os.path.join("data", "jeeprequestef9.png")).convert_alpha()
-            Viewer.images["red_bullet"]= pygame.image.load(
-                 os.path.join("data", "red_bullet.png")).convert_alpha()
-            Viewer.images["enemy1"]=pygame.image.load(
-                 os.path.join("data", "enemy1.png")).convert_alpha()
-            Viewer.images["player2"]=pygame.image.load(
-                 os.path.join("data", "jeeprequestef9.png")).convert_alpha()
-            Viewer.images["bullet"]= pygame.image.load(
-                 os.path.join("data", "bullet.png")).convert_alpha()
-            Viewer.images["muzzle_flash"]=pygame.image.load(
-                 os.path.join("data", "muzzle_flash.png")).convert_alpha()
-            Viewer.images["engine_glow"]=pygame.image.load(
-                 os.path.join("data", "engine_glow.png")).convert_alpha()
-            Viewer.images["enemy2"]=pygame.image.load(
-                 os.path.join("data", "tank1.png")).convert_alpha()
-            Viewer.images["boss1"]=pygame.image.load(
-                 os.path.join("data", "planet.png")).convert_alpha()
-            Viewer.images["tank1"]=pygame.image.load(
-                 os.path.join("data", "M-6_preview.png")).convert_alpha()
-            Viewer.images["tank2"]=pygame.image.load(
-                 os.path.join("data", "E-100_preview.png")).convert_alpha()
-            Viewer.images["tank3"]=pygame.image.load(
-                 os.path.join("data", "KV-2_preview.png")).convert_alpha()
-            Viewer.images["tank4"]=pygame.image.load(
-                 os.path.join("data", "Pz.Kpfw.IV-G_preview.png")).convert_alpha()
-            Viewer.images["tank5"]=pygame.image.load(
-                 os.path.join("data", "T34_preview.png")).convert_alpha()
-            Viewer.images["tank6"]=pygame.image.load(
-                 os.path.join("data", "Tiger-II_preview.png")).convert_alpha()
-            Viewer.images["tank7"]=pygame.image.load(
-                 os.path.join("data", "VK.3601h_preview.png")).convert_alpha()
-            Viewer.images["tree"]=pygame.image.load(
-                 os.path.join("data", "LPCsnowTrees.png")).convert_alpha()
-            Viewer.images["terrain"]=pygame.image.load(
-                 os.path.join("data", "terrain.png")).convert_alpha()
-            Viewer.images["river"]=Viewer.images["terrain"].subsurface(
-                  (576,159,671-576,193-159))
-            Viewer.images["Bunker1"]=pygame.image.load(
-                 os.path.join("data", "bunker1.png")).convert_alpha()
-
-
-            # --- scalieren ---
-            for name in Viewer.images:
-                if name == "tank1":
-                    Viewer.images[name] = pygame.transform.scale(
-                                    Viewer.images[name], (100,50))
-
-                if name == "tank2":
-                    Viewer.images[name] = pygame.transform.scale(
-                                    Viewer.images[name], (100,50))
-
-                if name == "tank3":
-                    Viewer.images[name] = pygame.transform.scale(
-                                    Viewer.images[name], (100,50))
-
-                if name == "tank4":
-                    Viewer.images[name] = pygame.transform.scale(
-                                    Viewer.images[name], (100,50))
-
-                if name == "tank5":
-                    Viewer.images[name] = pygame.transform.scale(
-                                    Viewer.images[name], (100,50))
-
-                if name == "tank6":
-                    Viewer.images[name] = pygame.transform.scale(
-                                    Viewer.images[name], (100,50))
-
-                if name == "tank7":
-                    Viewer.images[name] = pygame.transform.scale(
-                                    Viewer.images[name], (100,50))
-
-                if name == "boss1" :
-                    Viewer.images[name] = pygame.transform.scale(
-                                    Viewer.images[name], (150,150))
-                if "player" in name:
-                     Viewer.images[name] = pygame.transform.scale(
-                                    Viewer.images[name], (50,50))
-                if "enemy" in name:
-                     Viewer.images[name] = pygame.transform.scale(
-                                    Viewer.images[name], (50,50))
-                if "muzzle_flash" in name:
-                     Viewer.images[name] = pygame.transform.scale(
-                                    Viewer.images[name], (50,30))
-                        
-                #if "tree" in name:
-                #     Viewer.images[name] = pygame.transform.scale(
-                #                    Viewer.images[name], (50,30))
+            t0 = time.perf_counter()
+            Viewer.masks = {} # made from the old images
+            Viewer.rotations = {}
+            # --- procedural images and animation frames ---
+            Viewer.painted = {}
+            Viewer.painted_surfaces = set()
+            Plasma.prerender()
+            Smoke.prerender((100,100,100))
+            for color in ((255,0,0), (0,255,0), (0,0,255)):
+                painted_image(PowerUp.paint, color)
+            t0 = self.lap("prerender", t0)
+            self.load_assets()
+            t0 = self.lap("assets", t0)
+
+            # --- rotate projectiles for every angle, they fly in all directions
+            if self.prewarm:
+                for name in ("bullet", "red_bullet"):
+                    angle = 0
+                    while angle < 360:
+                        Viewer.rotated(name, angle)
+                        angle += Viewer.angle_precision
+                self.lap("prewarm", t0)
 
 
 
@@ -1422,7 +2668,11 @@ class Viewer(object):
     def prepare_sprites(self):
         """painting on the surface and create sprites"""
         self.load_sprites()
-        self.allgroup =  pygame.sprite.LayeredUpdates() # for drawing
+        t0 = time.perf_counter()
+        # player1 must be sprite number 0, see Enemy3.fire
+        VectorSprite.number = 0
+        VectorSprite.numbers = {}
+        self.allgroup =  LayerBuckets() # for drawing
         self.tracergroup = pygame.sprite.Group()
         self.mousegroup = pygame.sprite.Group()
         self.explosiongroup = pygame.sprite.Group()
@@ -1443,15 +2693,30 @@ class Viewer(object):
         Spaceship.groups = self.allgroup, self.playergroup  # , self.tailgroup
         Rocket.groups = self.allgroup, self.rocketgroup
         Evilrocket.groups = self.allgroup, self.evilrocketgroup
+        self.pools = {"rocket": Pool(Rocket), "evilrocket": Pool(Evilrocket)}
+        Rocket.pool = self.pools["rocket"]
+        Evilrocket.pool = self.pools["evilrocket"]
         #Ufo.groups = self.allgroup
         Flytext.groups = self.allgroup, self.flytextgroup
         Explosion.groups= self.allgroup, self.explosiongroup
+        if numpy is not None:
+            self.particles = ParticleSystem()
+        else:
+            self.particles = None
+        Explosion.particles = self.particles
+        if self.use_engine:
+            self.engine = MovementEngine()
+        else:
+            self.engine = None
+        VectorSprite.engine = self.engine
+        self.world = ScrollLayer(self.background)
+        VectorSprite.world = self.world
         Muzzle_flash.groups= self.allgroup
         Enemy1.groups = self.allgroup, self.enemygroup
         PowerUp.groups = self.allgroup, self.powerupgroup
         Triangle.groups = self.allgroup,self.powerupgroup
         Tree.groups = self.allgroup, self.treegroup
-        River.groups = self.allgroup, self.rivergroup
+        River.groups = self.rivergroup, # drawn by self.world
         Bunker1.groups = self.allgroup, self.bunkergroup
         Plasma.groups = self.allgroup, self.evilrocketgroup
 
@@ -1463,12 +2728,23 @@ class Viewer(object):
         #p.rotate_ip(self.player1.angle)
         #Muzzle_flash(pos=pygame.math.Vector2(self.pos.x, self.pos.y) + p, max_age=0.1, angle = self.angle+180)
         #Engine_glow(bossnumber = self.player1.number, sticky_with_boss=True, angle = self.player1.angle+180)
+        self.lap("sprites", t0)
+
 
+    def write_menu(self):
+        """the fixed text of the shop menu"""
+        write(self.screen, "shopping menu:", x =100, y = 100)
+        write(self.screen, "buy doublegun for 50 coins", x =500, y = 150)
+        write(self.screen, "buy 100 extra hp for 60 coins", x =500, y = 250)
+        write(self.screen, "buy 10 extra speed for 75 coins", x =500, y = 350)
+        write(self.screen, "unlimited hp for 3$", x =500, y = 450)
 
     def menurun(self):
         running = True
         self.cursor = 150
         code = ""
+        changed = [] # dirty: rects of the coins, cursor and flytexts
+        full = True  # dirty: first frame clears and shows everything
         while running:
             milliseconds = self.clock.tick(self.fps) #
             seconds = milliseconds / 1000
@@ -1491,11 +2767,8 @@ class Viewer(object):
                         if self.cursor == 150 and self.coins > 50:
                             Flytext(200,100, "Doublegun!")
                             self.coins -= 50
-                            age = self.player1.age + 3600
-                            if age in self.player1.bonusrockets:
-                                self.player1.bonusrockets[self.player1.age+3600] += 1
-                            else:
-                                self.player1.bonusrockets[age] = 1
+                            self.player1.bonusrockets.add(
+                                 self.player1.age + 3600, 1)
                         if self.cursor == 250 and self.coins > 60:
                             Flytext(200,100, "100 extra hp")
                             self.coins -= 60
@@ -1503,11 +2776,7 @@ class Viewer(object):
                         if self.cursor == 350 and self.coins > 75:
                             Flytext(200,100, "10 extra speed")
                             self.coins -= 75
-                            age = self.player1.age + 3600
-                            if age in self.player1.bonusspeed:
-                                self.player1.bonusspeed[self.player1.age+3600] = 10
-                            else:
-                                self.player1.bonusspeed[age] = 10
+                            self.player1.bonusspeed[self.player1.age+3600] = 10
                                 
                         if self.cursor == 450 and self.coins > 50:
                             Flytext(200,100, "cheatcode eingeben")
@@ -1532,48 +2801,69 @@ class Viewer(object):
             
                         
             # ------delete everything on screen-------
-            self.screen.blit(self.background, (0, 0))
+            if self.dirty and not full:
+                # only what can change: coins, cursor and flytexts.
+                # the fixed text is restored only inside those rects
+                for rect in changed:
+                    self.screen.set_clip(rect)
+                    self.screen.blit(self.background, rect, rect)
+                    self.write_menu()
+                self.screen.set_clip(None)
+            else:
+                self.screen.blit(self.background, (0, 0))
+                self.write_menu()
             #---------write menu----------------------
-            write(self.screen, "shopping menu:", x =100, y = 100)
-            write(self.screen, "jour coins:{} ".format(self.coins), x =100, y = 200)
-            write(self.screen, "buy doublegun for 50 coins", x =500, y = 150)
-            write(self.screen, "buy 100 extra hp for 60 coins", x =500, y = 250)
-            write(self.screen, "buy 10 extra speed for 75 coins", x =500, y = 350)
-            write(self.screen, "unlimited hp for 3$", x =500, y = 450)
-            write(self.screen, "-->", x = 400, y = self.cursor,color = (255,0,0))
+            rects = [write(self.screen, "jour coins:{} ".format(self.coins), x =100, y = 200),
+                     write(self.screen, "-->", x = 400, y = self.cursor,color = (255,0,0))]
             
             
             # -------------- UPDATE all sprites -------
             self.flytextgroup.update(seconds)
 
             # ----------- clear, draw , update, flip -----------------
-            self.flytextgroup.draw(self.screen)
+            for flytext in self.flytextgroup:
+                rects.append(self.screen.blit(flytext.image, flytext.rect))
             
             # -------- next frame -------------
-            pygame.display.flip()
+            if self.dirty and not full:
+                pygame.display.update(changed + rects)
+            else:
+                pygame.display.flip()
+            changed = rects
+            full = False
     
     
-    def run(self):
-        """The mainloop"""
+    def run(self, max_frames=None, max_seconds=None):
+        """The mainloop.
+           max_frames / max_seconds (game time) end the loop early.
+           returns a dict with summary stats, see stats()"""
         self.coins = 1000
         running = True
         pygame.mouse.set_visible(False)
-        oldleft, oldmiddle, oldright  = False, False, False
+        self.oldleft, self.oldmiddle, self.oldright  = False, False, False
         self.snipertarget = None
         gameOver = False
         exittime = 0
+        self.frames = 0
+        walltime0 = time.perf_counter()
         while running:
-            milliseconds = self.clock.tick(self.fps) #
-            seconds = milliseconds / 1000
-            pygame.display.set_caption("player1 hp: {}".format(
-                                 self.player1.hitpoints))
-            milliseconds = self.clock.tick(self.fps) #
-            seconds = milliseconds / 1000
-            self.playtime += seconds
+            if self.headless:
+                # as fast as the cpu allows, exactly one step per frame
+                self.clock.tick()
+                steps = 1
+            else:
+                self.accumulator += self.clock.tick(self.fps) / 1000
+                steps = min(int(self.accumulator / self.timestep), self.max_steps)
+                self.accumulator = min(self.accumulator - steps * self.timestep,
+                                       self.timestep)
+                pygame.display.set_caption("player1 hp: {}".format(
+                                     self.player1.hitpoints))
             if gameOver:
                 if self.playtime > exittime:
                     break
             # -------- events ------
+            self.phasetimes = {}
+            tframe = t0 = time.perf_counter()
             for event in pygame.event.get():
                 if event.type == pygame.QUIT:
                     running = False
@@ -1583,254 +2873,487 @@ class Viewer(object):
                         running = False
                     if event.key == pygame.K_m:
                         self.menurun()
+                        self.accumulator = 0.0
+                        self.full_redraw = True # menu painted the screen
                     #if event.key == pygame.K_x:
                     #    Ufo(pos=pygame.math.Vector2(100,-100))
                     # ------- change Background image ----
                     if event.key == pygame.K_b:
                         self.loadbackground()
+                    # ------- profiler overlay on/off ----
+                    if event.key == pygame.K_F3:
+                        self.profiler.visible = not self.profiler.visible
+                        self.full_redraw = True
                     # ------- fire player 1 -----
                     if event.key == pygame.K_TAB and self.player1.hitpoints >0:
                         self.player1.fire()
-                    
+            self.lap("events", t0)
 
-            # ------delete everything on screen-------
-            self.screen.blit(self.background, (0, 0))
-            #self.screen.blit(Viewer.images["river"],(100,100)
-            if random.random() < 0.0005:
-                Enemy2()
-            #------ Enemy3 (tank) -----
-            if random.random() < 0.002:
-                Enemy3()
-            # ----- Enemy4(tank)-----------
-            if random.random() < 0.0002:
-                Enemy4()
-            #--------Enemy5(tank)-------
-            if random.random() < 0.0002:
-                Enemy5()
-            #--------Enemy6(tank)------
-            if random.random() < 0.0002:
-                Enemy6()
-            #-----Enemy7(tank)--------
-            if random.random() < 0.0002:
-                Enemy7()
-            #-------Enemy8(tank)------
-            if random.random() < 0.0002:
-                Enemy8()
-            #-------Enemy9(tank)-----
-            if random.random() < 0.0002:
-                Enemy9()
-            #-----Enemy10(tank)------
-            if random.random() < 0.0002:
-                Enemy10()
-            # --------- Powerup ------------
-            if random.random() < 0.04:
-                PowerUp()
-            ##----------triangle---
-            #if random.random() < 0.07:
-            #    Triangle()
-            #--------tree----------------
-            if random.random() < 0.005:
-                Tree()
-            #--------river-------------
-            if random.random() < 0.005:
-                River()
-            #-------Bunker1---------
-            if random.random() < 0.005:
-                Bunker1()
-   
-
-            # ------ move indicator for player 1 -----
-            #pygame.draw.circle(self.screen, (0,255,0), (100,100), 100,1)
-            #glitter = (0, random.randint(128, 255), 0)
-            #pygame.draw.line(self.screen, glitter, (100,100),
-            #                (100 + self.player1.move.x, 100 - self.player1.move.y))
-
-
-            # ------------ pressed keys ------
-            pressed_keys = pygame.key.get_pressed()
-            # ------- movement keys for player1 -------
-            if pressed_keys[pygame.K_a]:
-                self.player1.strafe_left()
-            if pressed_keys[pygame.K_d]:
-                self.player1.strafe_right()
-            if pressed_keys[pygame.K_w]:
-                self.player1.move_forward()
-            if pressed_keys[pygame.K_s]:
-                self.player1.move_backward()
-            if pressed_keys[pygame.K_TAB]:
-                if self.player1.hitpoints > 0:
-                    self.player1.fire()
-
-            # ------ mouse handler ------
-            left,middle,right = pygame.mouse.get_pressed()
-            oldleft, oldmiddle, oldright = left, middle, right
-
-
-            # ------ joystick handler -------
-            for number, j in enumerate(self.joysticks):
-                if number == 0:
-                    player = self.player1
-                elif number ==1:
-                    player = self.player2
-                else:
-                    continue
-                x = j.get_axis(0)
-                y = j.get_axis(1)
-                if y > 0.5:
-                    player.move_backward()
-                if y < -0.5:
-                    player.move_forward()
-                if x > 0.5:
-                    player.turn_right()
-                if x < -0.5:
-                    player.turn_left()
-
-                buttons = j.get_numbuttons()
-                for b in range(buttons):
-                       pushed = j.get_button( b )
-                       if b == 0 and pushed:
-                           player.fire()
-                       if b == 4 and pushed:
-                           player.strafe_left()
-                       if b == 5 and pushed:
-                           player.strafe_right()
-
-
-
-
-            # write text below sprites
-            write(self.screen, "FPS: {:8.3}".format(
-                self.clock.get_fps() ), x=10, y=10)
-
-            # ----- collision detection between player and PowerUp---
-            for p in self.playergroup:
-                crashgroup=pygame.sprite.spritecollide(p,
-                           self.powerupgroup, False,
-                           pygame.sprite.collide_mask)
-                for o in crashgroup:
-                    if o.color == (255,0,0):
-                        Viewer.powersound1.play()
-                        Flytext(o.pos.x, - o.pos.y, "+50 hitpoints")
-                        p.hitpoints += 50
-                        Explosion(o.pos, red=255, green=0, blue=0)
-                        o.kill()
-                    elif o.color == (0,255,0):
-                        Viewer.powersound2.play()
-                        Flytext(o.pos.x, - o.pos.y, "+5 speed for 20 seconds")
-                        p.bonusspeed[p.age+20] = 5
-                        Explosion(o.pos, red=0, green=255, blue=0)
-                        o.kill()
-                    elif o.color == (0,0,255):
-                        Viewer.powersound3.play()
-                        Flytext(o.pos.x, -o.pos.y, "+1 Bonusrockets for 10 seconds")
-                        p.bonusrockets[p.age+10] = 1
-                        Explosion(o.pos, red=0, green=0, blue=255)
-                        o.kill()
+            # ------- fixed simulation steps, independent of rendering ----
+            for _ in range(steps):
+                self.step(self.timestep)
+                if max_frames is not None and self.frames >= max_frames:
+                    running = False
+                    break
+                if max_seconds is not None and self.playtime >= max_seconds:
+                    running = False
+                    break
+            self.render()
+            if self.firstframe is None:
+                self.firstframe = time.perf_counter() - self.started
+            self.phasetimes["frame"] = time.perf_counter() - tframe
+            self.profiler.record(self.phasetimes)
+        #-----------------------------------------------------
+        result = self.stats(time.perf_counter() - walltime0)
+        pygame.mouse.set_visible(True)
+        pygame.quit()
+        return result
+
+    def step(self, seconds):
+        """advance the game by one fixed simulation step of seconds:
+           spawning, player input, collision detection and update"""
+        self.playtime += seconds
+        self.frames += 1
+        for pool in self.pools.values():
+            pool.flush()
+        t0 = time.perf_counter()
+        # ------ next wave? ------
+        if self.waveend is not None and self.playtime >= self.waveend:
+            self.start_wave(min(Viewer.wave + 1, len(Viewer.waves) - 1))
+        for spawn in self.spawner.due(self.playtime):
+            spawn()
+        t0 = self.lap("spawn", t0)
+
+        # ------------ pressed keys ------
+        pressed_keys = pygame.key.get_pressed()
+        # ------- movement keys for player1 -------
+        if pressed_keys[pygame.K_a]:
+            self.player1.strafe_left()
+        if pressed_keys[pygame.K_d]:
+            self.player1.strafe_right()
+        if pressed_keys[pygame.K_w]:
+            self.player1.move_forward()
+        if pressed_keys[pygame.K_s]:
+            self.player1.move_backward()
+        if pressed_keys[pygame.K_TAB]:
+            if self.player1.hitpoints > 0:
+                self.player1.fire()
+
+        # ------ mouse handler ------
+        left,middle,right = pygame.mouse.get_pressed()
+        self.oldleft, self.oldmiddle, self.oldright = left, middle, right
+
+
+        # ------ joystick handler -------
+        for number, j in enumerate(self.get_joysticks()):
+            if number == 0:
+                player = self.player1
+            elif number ==1:
+                player = self.player2
+            else:
+                continue
+            x = j.get_axis(0)
+            y = j.get_axis(1)
+            if y > 0.5:
+                player.move_backward()
+            if y < -0.5:
+                player.move_forward()
+            if x > 0.5:
+                player.turn_right()
+            if x < -0.5:
+                player.turn_left()
+
+            buttons = j.get_numbuttons()
+            for b in range(buttons):
+                   pushed = j.get_button( b )
+                   if b == 0 and pushed:
+                       player.fire()
+                   if b == 4 and pushed:
+                       player.strafe_left()
+                   if b == 5 and pushed:
+                       player.strafe_right()
+        t0 = self.lap("input", t0)
+
+        tcollision = t0
+        self.spatial["powerup"].rebuild(self.powerupgroup)
+        self.spatial["rocket"].rebuild(self.rocketgroup)
+        self.spatial["tree"].rebuild(self.treegroup)
+        self.spatial["evilrocket"].rebuild(self.evilrocketgroup)
+        self.spatial["enemy"].rebuild(self.enemygroup)
+        self.spatial["bunker"].rebuild(self.bunkergroup)
+        t0 = self.lap("broadphase", t0)
+        # ----- collision detection between player and PowerUp---
+        for p in self.playergroup:
+            crashgroup=self.spatial["powerup"].spritecollide(p,
+                       False, pygame.sprite.collide_mask)
+            for o in crashgroup:
+                if o.color == (255,0,0):
+                    Viewer.sounds.play("powersound1")
+                    Flytext(o.pos.x, - o.pos.y, "+50 hitpoints")
+                    p.hitpoints += 50
+                    Explosion(o.pos, red=255, green=0, blue=0)
+                    o.kill()
+                elif o.color == (0,255,0):
+                    Viewer.sounds.play("powersound2")
+                    Flytext(o.pos.x, - o.pos.y, "+5 speed for 20 seconds")
+                    p.bonusspeed[p.age+20] = 5
+                    Explosion(o.pos, red=0, green=255, blue=0)
+                    o.kill()
+                elif o.color == (0,0,255):
+                    Viewer.sounds.play("powersound3")
+                    Flytext(o.pos.x, -o.pos.y, "+1 Bonusrockets for 10 seconds")
+                    p.bonusrockets[p.age+10] = 1
+                    Explosion(o.pos, red=0, green=0, blue=255)
+                    o.kill()
 
 
-            
-                        
-            # ----- collision detection between tree and rocket -----
-            for t in self.treegroup:
-                crashgroup = pygame.sprite.spritecollide(t, self.rocketgroup,
-                             False, pygame.sprite.collide_mask)
-                for r in crashgroup:
-                        t.hitpoints -= random.randint(4,9)
-                        Explosion(pygame.math.Vector2(r.pos.x, r.pos.y))
-                        r.kill()
-                        
-            # ----- collision detection between player and treegroup -----
-            for p in self.playergroup:
-                crashgroup = pygame.sprite.spritecollide(p, self.treegroup,
-                             False, pygame.sprite.collide_mask)
-                for t in crashgroup:
-                    if t.bossnumber != p.number:
-                        if not p.bulletproof:
-                            p.hitpoints -= 5
-                        Explosion(pygame.math.Vector2(t.pos.x, t.pos.y))
-                        #elastic_collision(p, t)
-                        t.kill()
-
-            # ----- collision detection between player and Evilrocket -----
-            for p in self.playergroup:
-                crashgroup = pygame.sprite.spritecollide(p, self.evilrocketgroup,
-                             False, pygame.sprite.collide_mask)
-                for r in crashgroup:
-                    #if r.bossnumber != p.number:
-                    if not p.bulletproof:
-                        p.hitpoints -= random.randint(3,6)
+        
+                    
+        t0 = self.lap("powerup x player", t0)
+        # ----- collision detection between tree and rocket -----
+        for t in self.treegroup:
+            crashgroup = self.spatial["rocket"].spritecollide(t,
+                         False, pygame.sprite.collide_mask)
+            for r in crashgroup:
+                    t.hitpoints -= Viewer.rng.randint(4,9)
                     Explosion(pygame.math.Vector2(r.pos.x, r.pos.y))
-                    #elastic_collision(p, r)
-                    r.kill() 
-
-            
-            # ----- collision detection between enemy and rocket -----
-            for e in self.enemygroup:
-                crashgroup = pygame.sprite.spritecollide(e, self.rocketgroup,
-                             False, pygame.sprite.collide_mask)
-                for r in crashgroup:
-                     e.hitpoints -= r.damage
-                     self.coins += 1
-                     if e.hitpoints <= 0:
-                         self.coins += 100
-                     Explosion(posvector=r.pos)
-                     r.kill()
-                        
-            #collision detection between River and Enemy
-            for r in self.rivergroup:
-                crashgroup = pygame.sprite.spritecollide(r,
-                    self.enemygroup, False, pygame.sprite.collide_rect)
-                for e in crashgroup:
-                    e.pos += e.move * -0.5 * seconds #river makes slow
+                    r.kill()
                     
-            # ----- collision detection between player and Bunker -----
-            for p in self.playergroup:
-                crashgroup = pygame.sprite.spritecollide(p, self.bunkergroup,
-                             False, pygame.sprite.collide_rect)
-                for b in crashgroup:
-                    #if r.bossnumber != p.number:
+        t0 = self.lap("tree x rocket", t0)
+        # ----- collision detection between player and treegroup -----
+        for p in self.playergroup:
+            crashgroup = self.spatial["tree"].spritecollide(p,
+                         False, pygame.sprite.collide_mask)
+            for t in crashgroup:
+                if t.bossnumber != p.number:
                     if not p.bulletproof:
-                        Explosion(pygame.math.Vector2(b.pos.x, b.pos.y))
-                        #elastic_collision(p, b)
-                        p.hitpoints -= 10           
-            
-            # ----- collision detection between Bunker and rocket -----
-            for b in self.bunkergroup:
-                crashgroup = pygame.sprite.spritecollide(b, self.rocketgroup,
-                             False, pygame.sprite.collide_mask)
-                for r in crashgroup:
-                     b.hitpoints -= 1
-                     if b.hitpoints <= 0:
-                         self.coins += 10000
-                     Explosion(posvector=r.pos)
-                     r.kill() 
-            
-            
-            
-            
-            
-            
-            # -------------- UPDATE all sprites -------
-            self.allgroup.update(seconds)
+                        p.hitpoints -= 5
+                    Explosion(pygame.math.Vector2(t.pos.x, t.pos.y))
+                    #elastic_collision(p, t)
+                    t.kill()
+
+        t0 = self.lap("tree x player", t0)
+        # ----- collision detection between player and Evilrocket -----
+        for p in self.playergroup:
+            crashgroup = self.spatial["evilrocket"].spritecollide(p,
+                         False, pygame.sprite.collide_mask)
+            for r in crashgroup:
+                #if r.bossnumber != p.number:
+                if not p.bulletproof:
+                    p.hitpoints -= Viewer.rng.randint(3,6)
+                Explosion(pygame.math.Vector2(r.pos.x, r.pos.y))
+                #elastic_collision(p, r)
+                r.kill() 
 
-            # ----------- clear, draw , update, flip -----------------
-            self.allgroup.draw(self.screen)
-
-
-            # --- Martins verbesserter Mousetail -----
-            for mouse in self.tailgroup:
-                if len(mouse.tail)>2:
-                    for a in range(1,len(mouse.tail)):
-                        r,g,b = mouse.color
-                        pygame.draw.line(self.screen,(max(0,r-a),g,b),
-                                     mouse.tail[a-1],
-                                     mouse.tail[a],10-a*10//10)
-
-            # -------- next frame -------------
-            pygame.display.flip()
-        #-----------------------------------------------------
-        pygame.mouse.set_visible(True)
+        
+        t0 = self.lap("evilrocket x player", t0)
+        # ----- collision detection between enemy and rocket -----
+        for e in self.enemygroup:
+            crashgroup = self.spatial["rocket"].spritecollide(e,
+                         False, pygame.sprite.collide_mask)
+            for r in crashgroup:
+                 e.hitpoints -= r.damage
+                 self.coins += 1
+                 if e.hitpoints <= 0:
+                     self.coins += 100
+                 Explosion(posvector=r.pos)
+                 r.kill()
+                    
+        t0 = self.lap("enemy x rocket", t0)
+        #collision detection between River and Enemy
+        for r in self.rivergroup:
+            crashgroup = self.spatial["enemy"].spritecollide(r,
+                False, pygame.sprite.collide_rect)
+            for e in crashgroup:
+                e.pos += e.move * -0.5 * seconds #river makes slow
+                
+        t0 = self.lap("river x enemy", t0)
+        # ----- collision detection between player and Bunker -----
+        for p in self.playergroup:
+            crashgroup = self.spatial["bunker"].spritecollide(p,
+                         False, pygame.sprite.collide_rect)
+            for b in crashgroup:
+                #if r.bossnumber != p.number:
+                if not p.bulletproof:
+                    Explosion(pygame.math.Vector2(b.pos.x, b.pos.y))
+                    #elastic_collision(p, b)
+                    p.hitpoints -= 10           
+        
+        t0 = self.lap("bunker x player", t0)
+        # ----- collision detection between Bunker and rocket -----
+        for b in self.bunkergroup:
+            crashgroup = self.spatial["rocket"].spritecollide(b,
+                         False, pygame.sprite.collide_mask)
+            for r in crashgroup:
+                 b.hitpoints -= 1
+                 if b.hitpoints <= 0:
+                     self.coins += 10000
+                 Explosion(posvector=r.pos)
+                 r.kill() 
+        
+        
+        
+        
+        
+        
+        t0 = self.lap("bunker x rocket", t0)
+        self.lap("collision", tcollision)
+        # -------------- UPDATE all sprites -------
+        # engine first: like allgroup.update it moves the sprites that
+        # exist before the update, not those fired during it
+        if self.engine is not None:
+            self.engine.update(seconds)
+        self.world.update(seconds)
+        self.allgroup.update(seconds)
+        if self.particles is not None:
+            self.particles.update(seconds)
+        t0 = self.lap("update", t0)
+        Viewer.sounds.flush(self.playtime)
+        self.lap("sound", t0)
+
+    def render(self):
+        """draw the current game state and show it (unless headless)"""
+        t0 = time.perf_counter()
+        # the profiler overlay covers most of the screen anyway
+        changed, grounds = self.world.changes()
+        full = (not self.dirty or self.full_redraw or
+                self.profiler.visible or changed)
+        # ------delete everything on screen-------
+        if full:
+            self.world.draw(self.screen) # background with rivers
+        else: # where something was drawn last frame or the ground changed
+            screen = self.screen.get_rect()
+            grounds = [rect.clip(screen) for rect in grounds
+                       if screen.colliderect(rect)]
+            for rect in self.sprite_rects + self.overlay_rects + grounds:
+                self.world.draw(self.screen, rect)
+        overlays = []
+        if not self.profiler.visible:
+            # write text below sprites
+            overlays.append(write(self.screen, "FPS: {:8.3}".format(
+                self.clock.get_fps() ), x=10, y=10))
+        t0 = self.lap("clear", t0)
+        # ----------- clear, draw , update, flip -----------------
+        drawn = self.draw_sprites()
+        rects = self.sprite_rects + drawn
+        if not full:
+            rects += grounds
+        self.sprite_rects = drawn
+        if self.particles is not None:
+            rect = self.particles.draw(self.screen)
+            if rect is not None:
+                overlays.append(rect)
+        t0 = self.lap("draw", t0)
+
+        # --- Martins verbesserter Mousetail -----
+        for mouse in self.tailgroup:
+            if len(mouse.tail)>2:
+                for a in range(1,len(mouse.tail)):
+                    r,g,b = mouse.color
+                    overlays.append(pygame.draw.line(self.screen,
+                                 (max(0,r-a),g,b),
+                                 mouse.tail[a-1],
+                                 mouse.tail[a],10-a*10//10))
+
+        t0 = self.lap("tail", t0)
+        if self.profiler.visible:
+            self.profiler.draw(self.screen, self.groups())
+            t0 = self.lap("profiler", t0)
+        # -------- next frame -------------
+        rects += self.overlay_rects + overlays
+        self.overlay_rects = overlays
+        if not full:
+            area = sum(r.width * r.height for r in rects)
+            full = (len(rects) > self.max_dirty or
+                    area > self.max_dirty_area * self.width * self.height)
+        self.full_redraw = False
+        if full:
+            self.full_frames += 1
+            if not self.headless:
+                pygame.display.flip()
+        else:
+            self.dirty_frames += 1
+            if not self.headless:
+                pygame.display.update(rects)
+        self.lap("flip", t0)
+
+    def draw_sprites(self):
+        """blit allgroup in layer order with one Surface.blits call,
+           sprites completely outside the screen are skipped.
+           returns the rects drawn (only in dirty mode, else [])"""
+        screen = self.screen.get_rect()
+        batch = [(sprite.image, sprite.rect)
+                 for sprite in self.allgroup.sprites()
+                 if screen.colliderect(sprite.rect)]
+        if self.dirty:
+            return self.screen.blits(batch)
+        self.screen.blits(batch, False)
+        return []
+
+    def lap(self, phase, t0):
+        """add the seconds since t0 to the duration of phase, returns now"""
+        now = time.perf_counter()
+        self.phasetimes[phase] = self.phasetimes.get(phase, 0) + now - t0
+        return now
+
+    def groups(self):
+        """{ name: sprite group } for sprite counts"""
+        return {"all": self.allgroup,
+                "player": self.playergroup,
+                "rocket": self.rocketgroup,
+                "evilrocket": self.evilrocketgroup,
+                "enemy": self.enemygroup,
+                "powerup": self.powerupgroup,
+                "tree": self.treegroup,
+                "river": self.rivergroup,
+                "bunker": self.bunkergroup,
+                "flytext": self.flytextgroup,
+                "particles": self.particles or ()}
+
+    def fingerprint(self):
+        """hash of the game state: equal for equal seed and inputs"""
+        return zlib.crc32(repr([(s.__class__.__name__, s.number,
+                           round(s.pos.x, 3), round(s.pos.y, 3), s.hitpoints)
+                          for s in VectorSprite.numbers.values()]).encode())
+
+    def stats(self, walltime):
+        """summary of a session, returned by run()"""
+        return {"seed": self.seed,
+                "frames": self.frames,
+                "gametime": self.playtime,
+                "walltime": walltime,
+                "sprites": {name: len(group)
+                            for name, group in self.groups().items()},
+                "pools": {name: pool.stats()
+                          for name, pool in self.pools.items()},
+                "sounds": Viewer.sounds.stats(),
+                "first frame": self.firstframe,
+                "shown": {"dirty": self.dirty_frames,
+                          "full": self.full_frames},
+                "wave": Viewer.wave + 1,
+                "spawned": self.spawner.spawned,
+                "coins": self.coins,
+                "player1 hp": self.player1.hitpoints}
+
+# ---------------- benchmark scenarios ------------------
+# each scenario is called once per frame, before Viewer.step,
+# with the (headless) viewer and the frame number
+
+def scenario_tanks(viewer, frame):
+    """200 Enemy3 tanks on screen, firing salvos at player1"""
+    if frame == 0:
+        for _ in range(200):
+            Enemy3(pos=pygame.math.Vector2(
+                   Viewer.rng.randint(0, Viewer.width),
+                   -Viewer.rng.randint(0, Viewer.height)))
+
+def scenario_rockets(viewer, frame):
+    """player1 holds TAB with 49 bonusrockets until 5000 rockets are fired"""
+    if frame == 0:
+        viewer.player1.bonusrockets[10**9] = 49
+    if frame < 100:
+        viewer.player1.fire()
+
+def scenario_explosions(viewer, frame):
+    """a chain of 100 Explosions at once, every 30 frames"""
+    if frame % 30 == 0:
+        for _ in range(100):
+            Explosion(pygame.math.Vector2(
+                      Viewer.rng.randint(0, Viewer.width),
+                      -Viewer.rng.randint(0, Viewer.height)))
+
+def scenario_bunkers(viewer, frame):
+    """50 Bunker1 emitting Plasma every 15 frames"""
+    if frame == 0:
+        for _ in range(50):
+            Bunker1(pos=pygame.math.Vector2(
+                    Viewer.rng.randint(0, Viewer.width),
+                    -Viewer.rng.randint(0, Viewer.height)))
+    if frame % 15 == 0:
+        for b in viewer.bunkergroup:
+            b.fire()
+
+SCENARIOS = {"tanks": scenario_tanks,
+             "rockets": scenario_rockets,
+             "explosions": scenario_explosions,
+             "bunkers": scenario_bunkers}
+
+def benchmark(names=None, frames=300, seed=1, width=1430, height=800,
+              dirty=False):
+    """run the named scenarios (default: all) headless with a fixed seed,
+       prints and returns mean/p95/p99 frame time in milliseconds per phase
+       { scenario: { phase: (mean, p95, p99) } }"""
+    if not names:
+        names = list(SCENARIOS)
+    results = {}
+    for name in names:
+        viewer = Viewer(width, height, headless=True, seed=seed, dirty=dirty)
+        viewer.coins = 0
+        viewer.player1.bulletproof = True # same amount of work every run
+        times = {} # { phase: [milliseconds, ...] }
+        for frame in range(frames):
+            viewer.phasetimes = {}
+            t0 = time.perf_counter()
+            SCENARIOS[name](viewer, frame)
+            viewer.lap("scenario", t0)
+            viewer.step(viewer.timestep)
+            viewer.render()
+            viewer.phasetimes["frame"] = time.perf_counter() - t0
+            for phase, seconds in viewer.phasetimes.items():
+                times.setdefault(phase, []).append(seconds * 1000)
         pygame.quit()
+        results[name] = {phase: (sum(ms) / len(ms), percentile(ms, 95),
+                                 percentile(ms, 99))
+                         for phase, ms in times.items()}
+        print("--- {} ({} frames, seed {}) ---".format(name, frames, seed))
+        print("{:>12} {:>9} {:>9} {:>9}".format("ms", "mean", "p95", "p99"))
+        for phase in ("scenario", "spawn", "input", "collision", "update",
+                      "sound", "clear", "draw", "tail", "flip", "frame"):
+            if phase in results[name]:
+                print("{:>12} {:9.3f} {:9.3f} {:9.3f}".format(
+                      phase, *results[name][phase]))
+        for poolname, pool in viewer.pools.items():
+            print("{:>12} pool: {requests} spawned, {hitrate:.0%} reused, "
+                  "peak {peak} alive".format(poolname, **pool.stats()))
+    return results
 
 if __name__ == '__main__':
-    Viewer(1430,800).run() # try Viewer(800,600).run()
+    import argparse
+    parser = argparse.ArgumentParser(description="panzergame")
+    parser.add_argument("--headless", action="store_true",
+                        help="no window, no sound, no fps cap "
+                             "(needs --frames or --seconds)")
+    parser.add_argument("--frames", type=int, default=None,
+                        help="stop after this many frames")
+    parser.add_argument("--seconds", type=float, default=None,
+                        help="stop after this many seconds of game time")
+    parser.add_argument("--seed", type=int, default=None,
+                        help="same seed + same inputs = same game")
+    parser.add_argument("--dirty", action="store_true",
+                        help="show only the changed screen regions")
+    parser.add_argument("--startup", action="store_true",
+                        help="print the startup time of every phase and asset")
+    parser.add_argument("--mute", action="store_true",
+                        help="no sound, the mixer is not started")
+    parser.add_argument("--benchmark", nargs="*", default=None,
+                        metavar="SCENARIO", choices=list(SCENARIOS),
+                        help="run benchmark scenarios (default: all) and exit")
+    args = parser.parse_args()
+    if args.benchmark is not None:
+        benchmark(args.benchmark, frames=args.frames or 300,
+                  seed=args.seed if args.seed is not None else 1,
+                  dirty=args.dirty)
+        raise SystemExit
+    if args.headless and args.frames is None and args.seconds is None:
+        # nobody can close a window that is not there
+        parser.error("--headless needs --frames or --seconds")
+    viewer = Viewer(1430,800, headless=args.headless, seed=args.seed,
+                    dirty=args.dirty, sound=not (args.headless or args.mute))
+    if args.startup:
+        print(viewer.startup_report())
+    result = viewer.run(max_frames=args.frames, max_seconds=args.seconds)
+    if args.startup:
+        print("first frame after {:.1f} ms".format(result["first frame"] * 1000))
+    if args.headless:
+        print(result)
+    # try Viewer(800,600).run()
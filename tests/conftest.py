@@ -0,0 +1,22 @@
+"""the tests run headless: no window, no sound card needed"""
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+sys.path.insert(0, ROOT)
+
+
+@pytest.fixture
+def viewer(monkeypatch):
+    """a seeded headless Viewer, loading its files from data"""
+    import panzergame
+    import pygame
+    monkeypatch.chdir(ROOT)
+    viewer = panzergame.Viewer(640, 400, headless=True, seed=1,
+                               prewarm=False)
+    yield viewer
+    pygame.quit()
@@ -0,0 +1,133 @@
+import json
+import mmap
+import os
+
+import pygame
+import pytest
+
+from panzergame import AssetCache, FileCache, Viewer
+
+
+class BytesCache(FileCache):
+    """the files as they are, upper case"""
+    form = "upper"
+
+    def __init__(self, folder, datafolder):
+        FileCache.__init__(self, "bytes.raw", folder, datafolder)
+
+    def format(self):
+        return self.form
+
+    def read(self, path):
+        with open(path, "rb") as f:
+            return f.read()
+
+    def make(self, data, spec):
+        return data.upper()
+
+    def pack(self, data):
+        return data, ()
+
+    def unpack(self, view, extra):
+        return bytes(view)
+
+
+@pytest.fixture
+def folders(tmp_path):
+    data = tmp_path / "data"
+    data.mkdir()
+    (data / "a.txt").write_bytes(b"first")
+    (data / "b.txt").write_bytes(b"second")
+    return str(tmp_path / "cache"), str(data)
+
+
+SPECS = {"a": "a.txt", "b": "b.txt", "again": "a.txt"}
+
+
+def test_first_load_builds_second_hits(folders):
+    cache = BytesCache(*folders)
+    assert cache.load(SPECS) == {"a": b"FIRST", "b": b"SECOND",
+                                 "again": b"FIRST"}
+    assert cache.built and cache.hits == 0
+    cache = BytesCache(*folders)
+    assert cache.load(SPECS) == {"a": b"FIRST", "b": b"SECOND",
+                                 "again": b"FIRST"}
+    assert not cache.built and cache.hits == 3
+
+
+def test_changed_source_rebuilds(folders):
+    data = folders[1]
+    BytesCache(*folders).load(SPECS)
+    path = os.path.join(data, "b.txt")
+    with open(path, "wb") as f:
+        f.write(b"changed")
+    mtime = os.path.getmtime(path) + 10 # same second on some filesystems
+    os.utime(path, (mtime, mtime))
+    cache = BytesCache(*folders)
+    assert cache.load(SPECS)["b"] == b"CHANGED"
+    assert cache.built
+
+
+def test_changed_format_or_specs_rebuild(folders):
+    BytesCache(*folders).load(SPECS)
+    cache = BytesCache(*folders)
+    cache.form = "other"
+    cache.load(SPECS)
+    assert cache.built
+    cache = BytesCache(*folders)
+    cache.form = "other"
+    cache.load({"a": "a.txt"})
+    assert cache.built
+
+
+@pytest.mark.parametrize("damage", ["raw", "manifest"])
+def test_broken_cache_rebuilds(folders, damage):
+    cache = BytesCache(*folders)
+    cache.load(SPECS)
+    path = cache.rawfile if damage == "raw" else cache.manifestfile
+    with open(path, "r+b") as f:
+        f.truncate(5)
+    cache = BytesCache(*folders)
+    assert cache.load(SPECS)["b"] == b"SECOND"
+    assert cache.built
+
+
+def test_rewrite_replaces_the_files(folders):
+    folder, data = folders
+    cache = BytesCache(*folders)
+    cache.load(SPECS)
+    with open(cache.rawfile, "rb") as f:
+        old = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    before = old[:]
+    with open(os.path.join(data, "a.txt"), "wb") as f:
+        f.write(b"a longer first file")
+    os.utime(os.path.join(data, "a.txt"), (1, 1))
+    cache.load(SPECS)
+    assert cache.built
+    # a process that has mapped the old file still reads the old file
+    assert old[:] == before
+    old.close()
+    assert sorted(os.listdir(folder)) == ["bytes.json", "bytes.raw"]
+    with open(cache.manifestfile) as f:
+        manifest = json.load(f)
+    assert manifest["size"] == os.path.getsize(cache.rawfile)
+
+
+def test_subclass_must_implement_read_pack_unpack():
+    class Half(FileCache):
+        def read(self, path):
+            return None
+    with pytest.raises(TypeError):
+        Half("half.raw")
+
+
+def test_asset_cache_images_equal_the_rebuilt_ones(viewer, tmp_path):
+    cache = AssetCache(folder=str(tmp_path), datafolder="data")
+    built = cache.load(Viewer.assets)
+    assert cache.built
+    loaded = cache.load(Viewer.assets)
+    assert cache.hits == len(Viewer.assets)
+    for name, image in built.items():
+        assert loaded[name].get_size() == image.get_size()
+        assert (pygame.image.tostring(loaded[name], "RGBA") ==
+                pygame.image.tostring(image, "RGBA"))
@@ -0,0 +1,45 @@
+import random
+
+import pygame
+
+from panzergame import LayerBuckets
+
+
+class Thing(pygame.sprite.Sprite):
+    def __init__(self, layer):
+        self._layer = layer
+        pygame.sprite.Sprite.__init__(self)
+
+
+def test_draw_order_is_layer_order():
+    rng = random.Random(1)
+    things = [Thing(rng.randint(-5, 9)) for _ in range(300)]
+    buckets = LayerBuckets(*things)
+    layered = pygame.sprite.LayeredUpdates(*things)
+    assert buckets.sprites() == layered.sprites()
+    layers = [thing._layer for thing in buckets.sprites()]
+    assert layers == sorted(layers)
+
+
+def test_draw_order_after_remove_and_add():
+    rng = random.Random(2)
+    things = [Thing(rng.randint(-5, 9)) for _ in range(300)]
+    buckets = LayerBuckets(*things)
+    layered = pygame.sprite.LayeredUpdates(*things)
+    for thing in rng.sample(things, 100):
+        thing.kill()
+    newer = [Thing(rng.randint(-8, 12)) for _ in range(100)]
+    buckets.add(*newer)
+    layered.add(*newer)
+    assert buckets.sprites() == layered.sprites()
+    assert len(buckets) == len(layered) == 300
+
+
+def test_layers_and_sprites_from_layer():
+    low, middle, high = Thing(-5), Thing(1), Thing(4)
+    buckets = LayerBuckets(high, low, middle)
+    assert buckets.layers() == [-5, 1, 4]
+    middle.kill()
+    assert buckets.layers() == [-5, 4]
+    assert buckets.get_sprites_from_layer(4) == [high]
+    assert buckets.get_sprites_from_layer(1) == []
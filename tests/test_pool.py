@@ -0,0 +1,59 @@
+import pygame
+import pytest
+
+from panzergame import Evilrocket, Rocket, Viewer, VectorSprite
+
+
+def spawn(cls, angle=0):
+    return cls.spawn(pos=pygame.math.Vector2(100, -100),
+                     move=pygame.math.Vector2(50, 0), angle=angle)
+
+
+@pytest.mark.parametrize("cls", [Rocket, Evilrocket])
+def test_killed_sprite_comes_back_only_after_flush(viewer, cls):
+    rocket = spawn(cls)
+    rocket.kill()
+    assert spawn(cls) is not rocket # still in this step
+    cls.pool.flush()
+    assert spawn(cls) is rocket
+
+
+@pytest.mark.parametrize("cls", [Rocket, Evilrocket])
+def test_revive_resets_state(viewer, cls):
+    rocket = spawn(cls, angle=10)
+    rocket.hitpoints = 3
+    rocket.age = 7
+    rocket.distance_traveled = 500
+    rocket.tail = [(1, 2)]
+    rocket.bossnumber = 12345 # an attribute the class does not have
+    rocket.kill()
+    cls.pool.flush()
+    again = spawn(cls, angle=37)
+    assert again is rocket
+    assert again.hitpoints == again.hitpointsfull == 100
+    assert again.age == 0 and again.distance_traveled == 0
+    assert again.tail == []
+    assert "bossnumber" not in vars(again)
+    assert again.alive() and VectorSprite.numbers[again.number] is again
+    assert cls.pool.reused == 1
+
+
+@pytest.mark.parametrize("cls", [Rocket, Evilrocket])
+def test_revive_keeps_the_shared_image(viewer, cls):
+    rocket = spawn(cls, angle=10)
+    rocket.kill()
+    cls.pool.flush()
+    again = spawn(cls, angle=37)
+    assert again.imagename == cls.imagename
+    assert again.image0 is Viewer.images[cls.imagename]
+    assert again.image is Viewer.rotated(cls.imagename, 37)
+
+
+def test_pool_keeps_no_more_than_maxfree(viewer):
+    Rocket.pool.maxfree = 3
+    rockets = [spawn(Rocket) for _ in range(5)]
+    for rocket in rockets:
+        rocket.kill()
+    Rocket.pool.flush()
+    assert len(Rocket.pool.free) == 3
+    assert Rocket.pool.alive == 0
@@ -0,0 +1,73 @@
+import pygame
+import pytest
+
+from panzergame import SoundManager, Viewer
+
+RULES = {"shot": (1, 0.5), "boom": (2, 0), "hum": (0, 0), "buzz": (0, 0)}
+
+
+@pytest.fixture
+def sounds(monkeypatch):
+    """one second of silence as Viewer.shot, .boom, .hum and .buzz"""
+    pygame.mixer.init(22050, -16, 1)
+    silence = pygame.mixer.Sound(buffer=bytes(2 * 22050))
+    for name in RULES:
+        monkeypatch.setattr(Viewer, name, silence, raising=False)
+    yield silence
+    pygame.mixer.quit()
+
+
+def test_same_sound_in_one_step_is_merged(sounds):
+    manager = SoundManager(RULES, voices=4)
+    for _ in range(3):
+        manager.play("boom")
+    manager.flush(0)
+    assert (manager.played, manager.merged, manager.requests) == (1, 2, 3)
+
+
+def test_cooldown(sounds):
+    manager = SoundManager(RULES, voices=4)
+    for now in (0, 0.2, 0.4, 0.6, 0.8, 1.2):
+        manager.play("shot")
+        manager.flush(now)
+    # 0 plays, 0.2 and 0.4 cool, 0.6 plays, 0.8 cools, 1.2 plays
+    assert (manager.played, manager.cooled) == (3, 3)
+
+
+def test_voice_stealing(sounds):
+    manager = SoundManager(RULES, voices=2)
+    manager.play("hum")
+    manager.play("buzz")
+    manager.flush(0) # both voices busy for one second
+    manager.play("boom") # higher priority: steals the oldest voice
+    manager.flush(0.1)
+    manager.play("shot") # higher than the hum or buzz still playing
+    manager.flush(0.2)
+    assert (manager.played, manager.stolen, manager.dropped) == (4, 2, 0)
+    manager.play("hum") # boom and shot playing: nothing lower to steal
+    manager.flush(0.3)
+    assert (manager.played, manager.dropped) == (4, 1)
+    manager.play("hum") # boom and shot ended, the voices are free
+    manager.flush(2.0)
+    assert (manager.played, manager.stolen) == (5, 2)
+
+
+def test_busy_in_game_time(sounds):
+    manager = SoundManager(RULES, voices=1)
+    manager.play("hum")
+    manager.flush(0)
+    manager.play("buzz") # same priority, the voice is busy
+    manager.flush(sounds.get_length() - 0.01)
+    manager.play("buzz")
+    manager.flush(sounds.get_length())
+    assert (manager.played, manager.dropped) == (2, 1)
+
+
+def test_without_mixer_nothing_is_dropped():
+    manager = SoundManager(RULES, mixer=False)
+    for now in range(20):
+        manager.play("hum")
+        manager.play("buzz")
+        manager.play("boom")
+        manager.flush(now)
+    assert (manager.played, manager.dropped, manager.stolen) == (60, 0, 0)
@@ -0,0 +1,58 @@
+import random
+
+import pygame
+import pytest
+
+from panzergame import SpatialHash
+
+
+class Box(pygame.sprite.Sprite):
+    def __init__(self, rect, *groups):
+        pygame.sprite.Sprite.__init__(self, *groups)
+        self.rect = pygame.Rect(rect)
+
+
+def boxes(rng, count, group):
+    return [Box((rng.randint(-150, 1500), rng.randint(-150, 850),
+                 rng.randint(1, 250), rng.randint(1, 250)), group)
+            for _ in range(count)]
+
+
+@pytest.mark.parametrize("cellsize", [10, 100, 1000])
+def test_spritecollide_equals_brute_force(cellsize):
+    rng = random.Random(cellsize)
+    group = pygame.sprite.Group()
+    boxes(rng, 400, group)
+    grid = SpatialHash(cellsize)
+    grid.rebuild(group)
+    for probe in boxes(rng, 200, ()):
+        assert (grid.spritecollide(probe) ==
+                pygame.sprite.spritecollide(probe, group, False))
+
+
+def test_killed_sprites_are_not_found():
+    rng = random.Random(1)
+    group = pygame.sprite.Group()
+    boxes(rng, 400, group)
+    grid = SpatialHash()
+    grid.rebuild(group)
+    for box in rng.sample(group.sprites(), 150):
+        box.kill() # after the rebuild, like in a collision loop
+    for probe in boxes(rng, 200, ()):
+        assert (grid.spritecollide(probe) ==
+                pygame.sprite.spritecollide(probe, group, False))
+
+
+def test_collided_and_dokill():
+    group = pygame.sprite.Group()
+    near = Box((0, 0, 20, 20), group)
+    far = Box((15, 15, 20, 20), group)
+    grid = SpatialHash()
+    grid.rebuild(group)
+    probe = Box((5, 5, 5, 5))
+    assert grid.spritecollide(probe) == [near]
+    probe = Box((10, 10, 10, 10))
+    closest = grid.spritecollide(probe, True,
+                                 pygame.sprite.collide_rect_ratio(0.5))
+    assert closest == [near]
+    assert not near.alive() and far.alive()
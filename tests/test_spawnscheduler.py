@@ -0,0 +1,59 @@
+import random
+
+from panzergame import SpawnScheduler
+
+
+def due_times(scheduler, now):
+    """the times of all spawns due until now, in the order they come"""
+    times = []
+    spawns = scheduler.due(now)
+    while scheduler.heap and scheduler.heap[0][0] <= now:
+        times.append(scheduler.heap[0][0])
+        next(spawns)
+    return times
+
+
+def test_spawns_come_earliest_first():
+    scheduler = SpawnScheduler(random.Random(1))
+    scheduler.set_rates({"a": 3.0, "b": 1.0, "c": 0.2}, 0)
+    times = due_times(scheduler, 500)
+    assert len(times) > 1000
+    assert times == sorted(times)
+
+
+def test_rate_is_spawns_per_second():
+    scheduler = SpawnScheduler(random.Random(2))
+    rates = {"a": 2.0, "b": 0.5, "c": 0.01}
+    scheduler.set_rates(rates, 0)
+    counts = dict.fromkeys(rates, 0)
+    seconds = 4000
+    for step in range(1, seconds * 30 + 1): # steps of 1/30 s
+        for spawn in scheduler.due(step / 30):
+            counts[spawn] += 1
+    for spawn, rate in rates.items():
+        expected = rate * seconds # poisson: standard deviation sqrt()
+        assert abs(counts[spawn] - expected) < 5 * expected ** 0.5
+    assert scheduler.spawned == sum(counts.values())
+
+
+def test_rate_zero_never_spawns():
+    scheduler = SpawnScheduler(random.Random(3))
+    scheduler.set_rates({"a": 0, "b": 1.0}, 0)
+    assert set(scheduler.due(1000)) == {"b"}
+
+
+def test_set_rates_replaces_the_old_rates():
+    scheduler = SpawnScheduler(random.Random(4))
+    scheduler.set_rates({"a": 1.0}, 0)
+    list(scheduler.due(10))
+    scheduler.set_rates({"b": 1.0}, 10)
+    assert set(scheduler.due(1000)) == {"b"}
+
+
+def test_same_seed_same_spawns():
+    runs = []
+    for _ in range(2):
+        scheduler = SpawnScheduler(random.Random(5))
+        scheduler.set_rates({"a": 1.0, "b": 0.3}, 0)
+        runs.append(due_times(scheduler, 300))
+    assert runs[0] == runs[1]